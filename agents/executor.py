@@ -8,10 +8,14 @@ The Executor Agent is responsible for:
 4. Reporting execution status back to the Supervisor
 """
 
-from typing import Tuple, Optional
-from tools.adb_tools import ADBTools
-from config.settings import SCREENSHOT_DELAY
+from typing import Tuple, Optional, Dict, Callable
+from tools.adb_tools import ADBTools, escape_input_text
+from config.settings import (
+    SCREENSHOT_DELAY, SCREENSHOT_CAPTURE_LEAD, WAIT_FOR_UI_IDLE, ACTION_DELAY
+)
 from utils.logger import setup_logger
+import asyncio
+import hashlib
 import time
 
 logger = setup_logger("ExecutorAgent")
@@ -22,6 +26,32 @@ class ExecutorAgent:
     Executor Agent that executes actions on the Android emulator.
     """
     
+    # Actions that inject input and can therefore change what is on screen
+    MUTATING_ACTIONS = frozenset({
+        "tap", "double_tap", "long_press", "type_text", "swipe",
+        "scroll_up", "scroll_down", "press_back", "press_home",
+        "press_enter", "press_menu", "launch_app", "close_app", "clear_text",
+        "sequence",
+    })
+    
+    # Shell commands for actions that can be batched into a "sequence"
+    BATCH_COMMANDS = {
+        "tap": lambda a: ["input", "tap", str(a.get("x", 0)), str(a.get("y", 0))],
+        "long_press": lambda a: [
+            "input", "swipe", str(a.get("x", 0)), str(a.get("y", 0)),
+            str(a.get("x", 0)), str(a.get("y", 0)), str(a.get("duration_ms", 1000))
+        ],
+        "swipe": lambda a: [
+            "input", "swipe", str(a.get("start_x", 0)), str(a.get("start_y", 0)),
+            str(a.get("end_x", 0)), str(a.get("end_y", 0)), str(a.get("duration_ms", 300))
+        ],
+        "type_text": lambda a: ["input", "text", escape_input_text(a.get("text", ""))],
+        "press_back": lambda a: ["input", "keyevent", "4"],
+        "press_home": lambda a: ["input", "keyevent", "3"],
+        "press_enter": lambda a: ["input", "keyevent", "66"],
+        "press_menu": lambda a: ["input", "keyevent", "82"],
+    }
+    
     def __init__(self, device_serial: str = None):
         """
         Initialize the Executor Agent.
@@ -32,9 +62,90 @@ class ExecutorAgent:
         self.adb = ADBTools(device_serial)
         self.last_action = None
         self.action_count = 0
+        self._screenshot_cache: Optional[Tuple[bytes, float]] = None
+        self._frame_key: Optional[bytes] = None
+        self._dirty = True
+        self._current_foreground_pkg: Optional[str] = None
+        self._ready_state_hash: Optional[bytes] = None
+        self._handlers, self._lookup_handlers = self._build_handlers()
         logger.info("ExecutorAgent initialized")
     
-    def execute(self, action: dict) -> Tuple[bool, str, Optional[str]]:
+    def _build_handlers(self) -> Tuple[Dict[str, Callable[[dict], str]], Dict[str, tuple]]:
+        """
+        Build the action dispatch tables once, keyed by action type.
+        
+        Returns:
+            Tuple of (handlers, lookup_handlers). Handlers map an action dict
+            to a result message. Lookup handlers find an element before
+            tapping it and are paired with the action field naming the
+            target, since a miss is reported as a "Could not find" message.
+        """
+        adb = self.adb
+        handlers = {
+            "tap": lambda a: adb.tap(a.get("x", 0), a.get("y", 0)),
+            "double_tap": lambda a: adb.double_tap(a.get("x", 0), a.get("y", 0)),
+            "long_press": lambda a: adb.long_press(
+                a.get("x", 0), a.get("y", 0), a.get("duration_ms", 1000)
+            ),
+            "type_text": lambda a: adb.type_text(a.get("text", "")),
+            "swipe": lambda a: adb.swipe(
+                a.get("start_x", 0), a.get("start_y", 0),
+                a.get("end_x", 0), a.get("end_y", 0),
+                a.get("duration_ms", 300)
+            ),
+            "scroll_up": lambda a: adb.scroll_up(),
+            "scroll_down": lambda a: adb.scroll_down(),
+            "press_back": lambda a: adb.press_back(),
+            "press_home": lambda a: adb.press_home(),
+            "press_enter": lambda a: adb.press_enter(),
+            "press_menu": lambda a: adb.press_menu(),
+            "launch_app": lambda a: adb.launch_app(a.get("package_name", "")),
+            "close_app": lambda a: adb.close_app(a.get("package_name", "")),
+            "wait": lambda a: adb.wait(a.get("seconds", 1)),
+            "clear_text": lambda a: adb.clear_text_field(),
+            "sequence": self._execute_sequence,
+        }
+        lookup_handlers = {
+            "tap_by_text": (
+                lambda a: adb.tap_element_by_text(a.get("text", ""), a.get("exact_match", True)),
+                "text"
+            ),
+            "tap_by_resource_id": (
+                lambda a: adb.tap_element_by_resource_id(a.get("resource_id", "")),
+                "resource_id"
+            ),
+            "tap_by_hint": (
+                lambda a: adb.tap_element_by_hint(a.get("hint", "")),
+                "hint"
+            ),
+        }
+        return handlers, lookup_handlers
+    
+    def _execute_sequence(self, action: dict) -> str:
+        """
+        Run the steps of a "sequence" action in one adb shell invocation.
+        
+        Args:
+            action: Sequence action with a "steps" list of simple actions
+        
+        Returns:
+            Result message
+        """
+        steps = action.get("steps", [])
+        if not steps:
+            raise ValueError("Sequence action has no steps")
+        
+        commands = []
+        for step in steps:
+            step_type = step.get("action", "").lower()
+            build = self.BATCH_COMMANDS.get(step_type)
+            if build is None:
+                raise ValueError(f"Action '{step_type}' cannot be part of a sequence")
+            commands.append(build(step))
+        
+        return self.adb.run_batch(commands)
+    
+    def execute(self, action: dict) -> Tuple[bool, str, Optional[bytes]]:
         """
         Execute a planned action.
         
@@ -42,7 +153,7 @@ class ExecutorAgent:
             action: Dictionary containing action details from Planner
             
         Returns:
-            Tuple of (success: bool, message: str, screenshot_base64: Optional[str])
+            Tuple of (success: bool, message: str, screenshot: Optional[bytes])
         """
         action_type = action.get("action", "").lower()
         description = action.get("description", "No description")
@@ -50,145 +161,144 @@ class ExecutorAgent:
         logger.info(f"Executing action: {action_type} - {description}")
         self.action_count += 1
         
+        if action_type in self.MUTATING_ACTIONS:
+            self._dirty = True
+            self._current_foreground_pkg = None
+        
         try:
-            result_message = ""
-            
-            # Execute based on action type
-            if action_type == "tap":
-                x = action.get("x", 0)
-                y = action.get("y", 0)
-                result_message = self.adb.tap(x, y)
-                
-            elif action_type == "double_tap":
-                x = action.get("x", 0)
-                y = action.get("y", 0)
-                result_message = self.adb.double_tap(x, y)
-                
-            elif action_type == "long_press":
-                x = action.get("x", 0)
-                y = action.get("y", 0)
-                duration = action.get("duration_ms", 1000)
-                result_message = self.adb.long_press(x, y, duration)
-                
-            elif action_type == "type_text":
-                text = action.get("text", "")
-                result_message = self.adb.type_text(text)
-                
-            elif action_type == "swipe":
-                start_x = action.get("start_x", 0)
-                start_y = action.get("start_y", 0)
-                end_x = action.get("end_x", 0)
-                end_y = action.get("end_y", 0)
-                duration = action.get("duration_ms", 300)
-                result_message = self.adb.swipe(start_x, start_y, end_x, end_y, duration)
-                
-            elif action_type == "scroll_up":
-                result_message = self.adb.scroll_up()
-                
-            elif action_type == "scroll_down":
-                result_message = self.adb.scroll_down()
-                
-            elif action_type == "press_back":
-                result_message = self.adb.press_back()
-                
-            elif action_type == "press_home":
-                result_message = self.adb.press_home()
-                
-            elif action_type == "press_enter":
-                result_message = self.adb.press_enter()
-                
-            elif action_type == "press_menu":
-                result_message = self.adb.press_menu()
-                
-            elif action_type == "launch_app":
-                package_name = action.get("package_name", "")
-                result_message = self.adb.launch_app(package_name)
-                
-            elif action_type == "close_app":
-                package_name = action.get("package_name", "")
-                result_message = self.adb.close_app(package_name)
-                
-            elif action_type == "wait":
-                seconds = action.get("seconds", 1)
-                result_message = self.adb.wait(seconds)
-                
-            elif action_type == "clear_text":
-                result_message = self.adb.clear_text_field()
-            
-            elif action_type == "tap_by_text":
-                text = action.get("text", "")
-                exact_match = action.get("exact_match", True)
-                result_message = self.adb.tap_element_by_text(text, exact_match)
-                if "Could not find" in result_message:
-                    logger.warning(f"Element not found: {text}")
-                    return False, result_message, self.adb.get_screenshot_base64()
-            
-            elif action_type == "tap_by_resource_id":
-                resource_id = action.get("resource_id", "")
-                result_message = self.adb.tap_element_by_resource_id(resource_id)
-                if "Could not find" in result_message:
-                    logger.warning(f"Element not found: {resource_id}")
-                    return False, result_message, self.adb.get_screenshot_base64()
-            
-            elif action_type == "tap_by_hint":
-                hint = action.get("hint", "")
-                result_message = self.adb.tap_element_by_hint(hint)
-                if "Could not find" in result_message:
-                    logger.warning(f"Element not found by hint: {hint}")
-                    return False, result_message, self.adb.get_screenshot_base64()
-                
-            elif action_type == "test_complete":
+            # Terminal actions only report the outcome and grab a final screenshot
+            if action_type == "test_complete":
                 result = action.get("result", "pass")
                 result_message = f"Test completed with result: {result}"
                 logger.info(f"TEST COMPLETE: {description}")
-                # Take final screenshot
-                time.sleep(SCREENSHOT_DELAY)
-                screenshot_b64 = self.adb.get_screenshot_base64()
-                return True, result_message, screenshot_b64
+                # Final screenshot (reuses the last frame if nothing changed)
+                return True, result_message, self.get_current_screenshot()
                 
-            elif action_type == "test_failed":
+            if action_type == "test_failed":
                 reason = action.get("reason", "Unknown reason")
                 result_message = f"Test failed: {reason}"
                 logger.warning(f"TEST FAILED: {reason} - {description}")
-                # Take final screenshot
-                time.sleep(SCREENSHOT_DELAY)
-                screenshot_b64 = self.adb.get_screenshot_base64()
-                return True, result_message, screenshot_b64
-                
+                # Final screenshot (reuses the last frame if nothing changed)
+                return True, result_message, self.get_current_screenshot()
+            
+            handler = self._handlers.get(action_type)
+            if handler is not None:
+                result_message = handler(action)
+            elif action_type in self._lookup_handlers:
+                lookup, target_key = self._lookup_handlers[action_type]
+                # Dump the UI once per frame; lookups retried on the same
+                # screen reuse it
+                self.adb.refresh_ui_tree(None if self._dirty else self._frame_key)
+                result_message = lookup(action)
+                if "Could not find" in result_message:
+                    logger.warning(f"Element not found by {target_key}: {action.get(target_key, '')}")
+                    return False, result_message, self.get_current_screenshot()
             else:
                 logger.warning(f"Unknown action type: {action_type}")
                 result_message = f"Unknown action type: {action_type}"
                 return False, result_message, None
             
-            # Wait for UI to update and take screenshot
-            time.sleep(SCREENSHOT_DELAY)
-            screenshot_b64 = self.adb.get_screenshot_base64()
+            # Wait for UI to update and take screenshot. A wait action has
+            # already paused for as long as the planner asked.
+            settle = 0.0 if action_type == "wait" else SCREENSHOT_DELAY
+            screenshot = self._capture_screenshot(settle=settle)
             
             self.last_action = action
             logger.info(f"Action executed successfully: {result_message}")
             
-            return True, result_message, screenshot_b64
+            return True, result_message, screenshot
             
         except Exception as e:
             error_msg = f"Execution error: {str(e)}"
             logger.error(error_msg)
+            self._dirty = True
             
             # Try to get screenshot even after error
             try:
-                screenshot_b64 = self.adb.get_screenshot_base64()
+                screenshot = self._capture_screenshot()
             except:
-                screenshot_b64 = None
+                screenshot = None
                 
-            return False, error_msg, screenshot_b64
+            return False, error_msg, screenshot
+    
+    async def execute_async(self, action: dict) -> Tuple[bool, str, Optional[bytes]]:
+        """
+        Execute a planned action without blocking the event loop.
+        
+        Args:
+            action: Dictionary containing action details from Planner
+        
+        Returns:
+            Same as execute()
+        """
+        return await asyncio.to_thread(self.execute, action)
+    
+    def _capture_screenshot(self, settle: float = 0.0) -> bytes:
+        """
+        Capture a fresh screenshot and remember it as the current frame.
+        
+        Args:
+            settle: Maximum seconds to let the UI settle first. With
+                WAIT_FOR_UI_IDLE the wait ends as soon as the UI is idle.
+                Otherwise the screencap process is started
+                SCREENSHOT_CAPTURE_LEAD seconds before the wait ends, so its
+                startup cost overlaps the rest of the wait.
+        """
+        if settle > 0 and WAIT_FOR_UI_IDLE:
+            self.adb.wait_for_idle(timeout=settle)
+            return self._store_frame(self.adb.get_screenshot_bytes())
+        lead = min(settle, SCREENSHOT_CAPTURE_LEAD)
+        if settle > lead:
+            time.sleep(settle - lead)
+        proc = self.adb.start_screenshot()
+        if lead > 0:
+            time.sleep(lead)
+        return self._store_frame(self.adb.finish_screenshot(proc))
     
-    def get_current_screenshot(self) -> str:
+    async def _capture_screenshot_async(self, settle: float = 0.0) -> bytes:
+        """
+        Coroutine version of _capture_screenshot().
+        
+        Without idle polling the settle time is an asyncio sleep and the
+        capture an asyncio subprocess, so neither occupies a worker thread.
         """
-        Get the current screen state as base64 encoded image.
+        if settle > 0 and WAIT_FOR_UI_IDLE:
+            await asyncio.to_thread(self.adb.wait_for_idle, settle)
+            return self._store_frame(await self.adb.get_screenshot_bytes_async())
+        lead = min(settle, SCREENSHOT_CAPTURE_LEAD)
+        if settle > lead:
+            await asyncio.sleep(settle - lead)
+        capture = asyncio.ensure_future(self.adb.get_screenshot_bytes_async())
+        if lead > 0:
+            await asyncio.sleep(lead)
+        return self._store_frame(await capture)
+    
+    def _store_frame(self, screenshot: bytes) -> bytes:
+        """Remember a fresh screenshot as the current frame."""
+        self._screenshot_cache = (screenshot, time.time())
+        self._frame_key = hashlib.blake2b(screenshot, digest_size=8).digest()
+        self._dirty = False
+        return screenshot
+    
+    def get_current_screenshot(self) -> bytes:
+        """
+        Get the current screen state as PNG bytes.
+        
+        The last captured frame is reused until an action that can
+        change the UI has been executed.
         
         Returns:
-            Base64 encoded screenshot
+            PNG screenshot bytes
         """
-        return self.adb.get_screenshot_base64()
+        if not self._dirty and self._screenshot_cache is not None:
+            return self._screenshot_cache[0]
+        return self._capture_screenshot()
+    
+    async def get_current_screenshot_async(self) -> bytes:
+        """Coroutine version of get_current_screenshot()."""
+        if not self._dirty and self._screenshot_cache is not None:
+            return self._screenshot_cache[0]
+        return await self._capture_screenshot_async()
     
     def get_action_count(self) -> int:
         """Get the total number of actions executed."""
@@ -198,6 +308,10 @@ class ExecutorAgent:
         """Reset the executor state for a new test."""
         self.last_action = None
         self.action_count = 0
+        self._screenshot_cache = None
+        self._frame_key = None
+        self._dirty = True
+        self._current_foreground_pkg = None
         logger.info("ExecutorAgent reset")
     
     def prepare_for_test(self, launch_obsidian: bool = True):
@@ -209,15 +323,23 @@ class ExecutorAgent:
             launch_obsidian: If True, launch Obsidian app after preparation
         """
         logger.info("Preparing emulator for test")
+        self._dirty = True
         
-        # Press home to ensure we start from home screen
-        self.adb.press_home()
-        time.sleep(1)
+        # Skip the relaunch when Obsidian is still showing the screen it had
+        # right after the last fresh launch
+        if launch_obsidian and self._is_ready_for_test():
+            logger.info("Obsidian already at its start screen, skipping relaunch")
+            return
         
-        # Close Obsidian if running
+        # Press home to ensure we start from home screen and close Obsidian if
+        # running. The two are independent, so they run concurrently in one
+        # shell call and only the longer settle time is waited.
         try:
-            self.adb.close_app("md.obsidian")
-            time.sleep(0.5)
+            self.adb.run_batch([
+                ["input", "keyevent", "3"],
+                ["am", "force-stop", "md.obsidian"]
+            ], parallel=True)
+            time.sleep(max(0.0, 1 - ACTION_DELAY))
         except:
             pass
         
@@ -226,5 +348,29 @@ class ExecutorAgent:
             logger.info("Launching Obsidian for test")
             self.adb.launch_app("md.obsidian")
             time.sleep(2)  # Wait for app to fully load
+            self._current_foreground_pkg = "md.obsidian"
+            self._ready_state_hash = self.adb.get_ui_state_hash()
+        else:
+            self._current_foreground_pkg = None
+            self._ready_state_hash = None
         
         logger.info("Emulator prepared for test")
+    
+    def _is_ready_for_test(self) -> bool:
+        """
+        Check whether Obsidian is in the foreground at its fresh-launch screen.
+        
+        Returns:
+            True if the close and relaunch in prepare_for_test can be skipped
+        """
+        if self._ready_state_hash is None:
+            return False
+        
+        if self._current_foreground_pkg is None:
+            # e.g. "mCurrentFocus=Window{1a2b u0 md.obsidian/md.obsidian.MainActivity}"
+            component = next((t for t in self.adb.get_current_activity().split() if "/" in t), "")
+            self._current_foreground_pkg = component.split("/")[0]
+        if self._current_foreground_pkg != "md.obsidian":
+            return False
+        
+        return self.adb.get_ui_state_hash() == self._ready_state_hash
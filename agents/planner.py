@@ -12,22 +12,62 @@ from google.adk.agents import LlmAgent
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 import google.generativeai as genai
-from config.settings import GOOGLE_API_KEY, MODEL_NAME
+from google.generativeai import caching
+from config.settings import (
+    GOOGLE_API_KEY, MODEL_NAME, GEMINI_TRANSPORT, PLANNER_IMAGE_MAX_SIZE,
+    SCREEN_WIDTH, SCREEN_HEIGHT, USE_PROMPT_CACHE, PROMPT_CACHE_TTL_MINUTES,
+    PLANNER_CACHE_SIZE, PERSISTENT_PLANNER_CACHE, PLANNER_CACHE_DB
+)
+from agents.planner_cache import PlannerCache
 from utils.logger import setup_logger
-import base64
+from utils.image_utils import encode_for_planner, perceptual_hash
+from utils.rate_limiter import get_gemini_limiter, estimate_tokens
+from typing import Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import datetime
+import functools
 import json
 import time
 import re
+import orjson
 
 logger = setup_logger("PlannerAgent")
 
 # Rate limiting configuration
-API_CALL_DELAY = 3  # 3 seconds between calls (ensures < 20 req/min)
 MAX_RETRIES = 2     # Fewer retries needed since we won't hit limits often
 INITIAL_RETRY_DELAY = 5  # Short retry if somehow rate limited
 
-# Configure Gemini
-genai.configure(api_key=GOOGLE_API_KEY)
+# Seconds before expiry at which the prompt cache TTL is extended
+PROMPT_CACHE_REFRESH_MARGIN = 120
+
+# Number of most recent actions sent to the model in full
+PREVIOUS_ACTIONS_WINDOW = 5
+
+# Appended to the prompt when the previous response could not be parsed
+_INVALID_JSON_NOTE = "\nYour previous response was not valid JSON, try again. Respond with a single JSON object only.\n"
+
+# Verdicts depend on details a screen hash cannot see (e.g. a small icon's
+# color or a line of text), so they are always asked from the model
+_TERMINAL_ACTIONS = frozenset(("test_complete", "test_failed"))
+
+# Safe default when the response stays unparseable
+_PLANNING_ERROR_ACTION = {
+    "action": "wait",
+    "seconds": 1,
+    "description": "Waiting due to planning error, will retry"
+}
+
+# Retry delay shapes in rate limit errors: "... retry in 12.5s" and
+# "retry_delay { seconds: 12 }"
+_RETRY_IN_RE = re.compile(r'retry in (\d+\.?\d*)s')
+_RETRY_SECONDS_RE = re.compile(r'seconds:\s*(\d+)')
+
+# Response parsing
+_JSON_DECODER = json.JSONDecoder()
+
+# Configure Gemini once; the client and its connection are reused by every call
+genai.configure(api_key=GOOGLE_API_KEY, transport=GEMINI_TRANSPORT)
 
 PLANNER_SYSTEM_PROMPT = """You are a Mobile QA Test Planner Agent. Your role is to analyze the current screen state of an Android mobile app and decide what action to take next to complete the given test case.
 
@@ -86,6 +126,12 @@ You must respond with ONE of these actions in JSON format:
     {"action": "tap_by_hint", "hint": "<hint text>", "description": "<what field you're tapping>"}
     Example: {"action": "tap_by_hint", "hint": "My vault", "description": "Tap vault name input field"}
 
+15. SEQUENCE: Run several simple actions back to back without a screenshot in between
+    {"action": "sequence", "steps": [<action>, ...], "description": "<what the steps do>"}
+    Steps may only be tap, long_press, swipe, type_text, press_back, press_home, press_enter or press_menu.
+    Example: {"action": "sequence", "steps": [{"action": "tap", "x": 672, "y": 1400}, {"action": "type_text", "text": "InternVault"}, {"action": "press_enter"}], "description": "Enter vault name"}
+    Only use SEQUENCE when you are certain of every step without seeing the screen in between.
+
 ## Screen Coordinate Guidelines:
 - Screen resolution: 1344 x 2992 pixels (Pixel 8 Pro)
 - IMPORTANT: The screenshot shows the FULL screen. Estimate coordinates by percentage:
@@ -123,80 +169,316 @@ Respond ONLY with valid JSON. No additional text or explanation outside the JSON
 """
 
 
+def _parse_complete_object(text: str) -> Optional[dict]:
+    """
+    Parse the first JSON object in a partially streamed response.
+    
+    Returns:
+        The object once it is complete, otherwise None
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    try:
+        obj, _ = _JSON_DECODER.raw_decode(text, start)
+    except json.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _compact_history(previous_actions: Optional[list]) -> str:
+    """
+    Serialize the action history for the prompt with a bounded size.
+    
+    The last PREVIOUS_ACTIONS_WINDOW actions are kept; older ones are
+    folded into a single summary entry.
+    
+    Returns:
+        Compact JSON string
+    """
+    previous_actions = previous_actions or []
+    older = previous_actions[:-PREVIOUS_ACTIONS_WINDOW]
+    history = previous_actions[-PREVIOUS_ACTIONS_WINDOW:]
+    if older:
+        history = [{
+            "action": "summary",
+            "count": len(older),
+            "last_kinds": [a.get("action") for a in older[-PREVIOUS_ACTIONS_WINDOW:]]
+        }] + history
+    return orjson.dumps(history).decode()
+
+
+def _planner_failed_action(error: Optional[Exception]) -> dict:
+    """Build the action reported when all API attempts have failed."""
+    return {
+        "action": "test_failed",
+        "result": "fail",
+        "reason": f"Planner error after retries: {str(error)}",
+        "description": "Internal planner error"
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _get_model(model_name: str, system_instruction: str) -> genai.GenerativeModel:
+    """
+    Get a shared GenerativeModel for the given configuration.
+    
+    Planner instances (one per supervisor) reuse the same warm model and
+    its underlying connection instead of building a fresh client each.
+    """
+    logger.info(f"Creating Gemini model: {model_name}")
+    return genai.GenerativeModel(
+        model_name=model_name,
+        system_instruction=system_instruction
+    )
+
+
 class PlannerAgent:
     """
     Planner Agent that analyzes screenshots and decides next actions.
     Includes rate limiting and retry logic for API quota management.
     """
     
-    def __init__(self):
-        """Initialize the Planner Agent."""
-        self.model = genai.GenerativeModel(
-            model_name=MODEL_NAME,
-            system_instruction=PLANNER_SYSTEM_PROMPT
+    def __init__(self, use_cache: bool = True):
+        """
+        Initialize the Planner Agent.
+        
+        Args:
+            use_cache: Replay previously planned actions for unchanged screens
+        """
+        self.model = _get_model(MODEL_NAME, PLANNER_SYSTEM_PROMPT)
+        self._limiter = get_gemini_limiter()
+        self.use_cache = use_cache
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._disk_cache: Optional[PlannerCache] = None
+        if use_cache and PERSISTENT_PLANNER_CACHE:
+            try:
+                self._disk_cache = PlannerCache(PLANNER_CACHE_DB, PLANNER_SYSTEM_PROMPT + MODEL_NAME)
+            except Exception as e:
+                logger.warning(f"Persistent planner cache unavailable: {e}")
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._test_context: Optional[str] = None
+        self._cached_content = None
+        self._cached_model = None
+        self._cache_expires_at = 0.0
+        self._prompt_cache_failed = False
+        logger.info(
+            f"PlannerAgent initialized (system prompt ~{estimate_tokens(PLANNER_SYSTEM_PROMPT)} tokens)"
         )
-        self.history = []
-        self.last_api_call_time = 0  # Track last API call for rate limiting
-        logger.info("PlannerAgent initialized")
     
-    def _wait_for_rate_limit(self):
-        """Wait between API calls for smooth execution."""
-        elapsed = time.time() - self.last_api_call_time
-        if elapsed < API_CALL_DELAY:
-            wait_time = API_CALL_DELAY - elapsed
-            time.sleep(wait_time)
+    def _model_for_test(self, test_context: str) -> Tuple[genai.GenerativeModel, bool]:
+        """
+        Get the model to use for the current test.
+        
+        The system prompt and the test case context are stored once per test
+        as Gemini cached content, so each step only sends what changed.
+        
+        Args:
+            test_context: Prompt section describing the test case
+        
+        Returns:
+            Tuple of (model, whether test_context is already in its cache)
+        """
+        if not USE_PROMPT_CACHE or self._prompt_cache_failed:
+            return self.model, False
+        
+        ttl = datetime.timedelta(minutes=PROMPT_CACHE_TTL_MINUTES)
+        if test_context != self._test_context:
+            self._release_cache()
+            self._test_context = test_context
+            try:
+                self._cached_content = caching.CachedContent.create(
+                    model=MODEL_NAME,
+                    system_instruction=PLANNER_SYSTEM_PROMPT,
+                    contents=[test_context],
+                    ttl=ttl
+                )
+                self._cached_model = genai.GenerativeModel.from_cached_content(
+                    cached_content=self._cached_content
+                )
+                self._cache_expires_at = time.monotonic() + ttl.total_seconds()
+            except Exception as e:
+                # e.g. prompt below the minimum cacheable size; this will not
+                # change for later tests, so stop trying
+                logger.warning(f"Prompt caching unavailable, sending full prompt: {e}")
+                self._prompt_cache_failed = True
+        
+        if self._cached_model is None:
+            return self.model, False
+        
+        # Long tests can outlive the cache; extend it before it expires
+        if time.monotonic() > self._cache_expires_at - PROMPT_CACHE_REFRESH_MARGIN:
+            try:
+                self._cached_content.update(ttl=ttl)
+                self._cache_expires_at = time.monotonic() + ttl.total_seconds()
+            except Exception as e:
+                logger.warning(f"Failed to extend prompt cache, sending full prompt: {e}")
+                self._release_cache()
+                self._test_context = test_context
+                return self.model, False
+        return self._cached_model, True
+    
+    def _release_cache(self):
+        """Delete the cached content of the previous test, if any."""
+        cached, self._cached_content = self._cached_content, None
+        self._cached_model = None
+        self._test_context = None
+        if cached is not None:
+            try:
+                cached.delete()
+            except Exception as e:
+                logger.debug("Failed to delete cached content: %s", e)
+    
+    def _cache_key(
+        self,
+        screenshot_bytes: bytes,
+        test_description: str,
+        expected_result: str,
+        should_pass: bool,
+        previous_actions: Optional[list]
+    ) -> Optional[tuple]:
+        """
+        Build the memoization key for a planning call.
+        
+        The same screen, test case and last action lead to the same
+        decision, also across tests that share steps. The screen hash
+        covers both the layout and the colors on screen.
+        
+        Returns:
+            Cache key, or None if caching is disabled or the screen
+            could not be hashed
+        """
+        if not self.use_cache or (PLANNER_CACHE_SIZE <= 0 and self._disk_cache is None):
+            return None
+        try:
+            screen_hash = perceptual_hash(screenshot_bytes)
+        except Exception as e:
+            logger.debug("Could not hash screenshot: %s", e)
+            return None
+        last_action = previous_actions[-1] if previous_actions else None
+        if last_action is not None:
+            last_action = (last_action.get("action"), last_action.get("description"), last_action.get("success"))
+        return (screen_hash, test_description, expected_result, should_pass, last_action)
+    
+    def _cache_get(self, key: Optional[tuple], previous_actions: Optional[list]) -> Optional[dict]:
+        """
+        Look up a memoized action, first in memory, then on disk.
+        
+        A hit that would simply repeat the last action is ignored: the
+        screen did not change after it, so the model should get a chance
+        to choose differently.
+        """
+        if key is None:
+            return None
+        action = self._cache.get(key)
+        source = "cached"
+        if action is None and self._disk_cache is not None:
+            action = self._disk_cache.get(key)
+            source = "replayed"
+        if action is None or (
+            previous_actions and action.get("description") == previous_actions[-1].get("description")
+        ):
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        if source == "replayed":
+            self._remember(key, action)
+        else:
+            self._cache.move_to_end(key)
+        logger.info(f"Planned action ({source}): {action.get('action')} - {action.get('description', '')}")
+        return dict(action)
+    
+    def _remember(self, key: tuple, action: dict):
+        """Add an action to the in-memory cache, evicting the least recently used."""
+        if PLANNER_CACHE_SIZE <= 0:
+            return
+        self._cache[key] = dict(action)
+        self._cache.move_to_end(key)
+        if len(self._cache) > PLANNER_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def _cache_put(self, key: Optional[tuple], action: dict):
+        """Memoize a successfully parsed action (other than a verdict) in memory and on disk."""
+        if key is None or action.get("action") in _TERMINAL_ACTIONS:
+            return
+        self._remember(key, action)
+        if self._disk_cache is not None:
+            self._disk_cache.put(key, action)
+    
+    def cache_stats(self) -> dict:
+        """
+        Get action cache statistics for this planner.
+        
+        Returns:
+            Dictionary with hits, misses and hit_ratio
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_ratio": self.cache_hits / lookups if lookups else 0.0
+        }
+    
+    def _wait_for_rate_limit(self, est_tokens: int):
+        """Wait until the request quota allows another API call."""
+        self._limiter.acquire(est_tokens)
     
     def _extract_retry_delay(self, error_message: str) -> float:
         """Extract retry delay from error message if present."""
+        if not isinstance(error_message, str):
+            error_message = str(error_message)
+        
         # Try to extract "retry in Xs" or "retry_delay { seconds: X }"
-        match = re.search(r'retry in (\d+\.?\d*)s', str(error_message))
+        match = _RETRY_IN_RE.search(error_message)
         if match:
             return float(match.group(1)) + 1  # Add small buffer
         
         # Try to extract from "seconds: X" format
-        match = re.search(r'seconds:\s*(\d+)', str(error_message))
+        match = _RETRY_SECONDS_RE.search(error_message)
         if match:
             return float(match.group(1)) + 1
         
         return INITIAL_RETRY_DELAY
     
-    def analyze_and_plan(
-        self, 
-        screenshot_base64: str, 
+    def build_prompt(
+        self,
+        screenshot_bytes: bytes,
         test_description: str,
         expected_result: str,
         should_pass: bool,
-        previous_actions: list = None,
-        current_step: int = 1,
-        max_steps: int = 20
-    ) -> dict:
+        previous_actions: Optional[list],
+        current_step: int,
+        max_steps: int
+    ) -> Tuple[str, str, dict]:
         """
-        Analyze the current screen and plan the next action.
+        Build the prompt pieces for one planning call.
         
-        Args:
-            screenshot_base64: Base64 encoded screenshot
-            test_description: The test case description
-            expected_result: Expected outcome of the test
-            should_pass: Whether the test is expected to pass
-            previous_actions: List of previously executed actions
-            current_step: Current step number
-            max_steps: Maximum allowed steps
-            
         Returns:
-            Dictionary containing the planned action
+            Tuple of (test_context, step_context, image_part). The test
+            context only changes between tests; the step context and image
+            change every step.
         """
-        logger.info(f"Planning step {current_step}/{max_steps}")
+        # Re-encode the screenshot to a compact, downscaled image for upload
+        image_data, mime_type, (image_width, image_height) = encode_for_planner(screenshot_bytes)
+        scale_x = SCREEN_WIDTH / image_width
+        scale_y = SCREEN_HEIGHT / image_height
         
-        # Build context message
-        context = f"""
+        test_context = f"""
 ## Current Test Case:
 **Description:** {test_description}
 **Expected Result:** {expected_result}
 **Should Pass:** {"Yes" if should_pass else "No (this test is expected to FAIL - look for missing/wrong elements)"}
+"""
+        
+        step_context = f"""
+## Screenshot:
+The attached screenshot is {image_width} x {image_height}, downscaled from the {SCREEN_WIDTH} x {SCREEN_HEIGHT} device screen (scale_x={scale_x:.2f}, scale_y={scale_y:.2f}).
+Always give coordinates in the full device screen space: multiply image x by scale_x and image y by scale_y.
 
 ## Progress:
 - Current Step: {current_step} of {max_steps}
-- Previous Actions: {json.dumps(previous_actions or [], indent=2)}
+- Previous Actions: {_compact_history(previous_actions)}
 
 ## Task:
 Analyze the screenshot and decide the next action to progress this test.
@@ -207,78 +489,297 @@ What is your next action? Respond with JSON only.
         
         # Create the image part
         image_part = {
-            "mime_type": "image/png",
-            "data": screenshot_base64
+            "mime_type": mime_type,
+            "data": image_data
         }
+        return test_context, step_context, image_part
+    
+    def _build_request(
+        self,
+        screenshot_bytes: bytes,
+        test_description: str,
+        expected_result: str,
+        should_pass: bool,
+        previous_actions: Optional[list],
+        current_step: int,
+        max_steps: int
+    ) -> Tuple[genai.GenerativeModel, str, dict, int]:
+        """
+        Build the model, context message and image part for one planning call.
+        
+        Returns:
+            Tuple of (model, context, image_part, estimated input tokens)
+        """
+        test_context, step_context, image_part = self.build_prompt(
+            screenshot_bytes, test_description, expected_result, should_pass,
+            previous_actions, current_step, max_steps
+        )
+        # The test case part is served from the prompt cache when available
+        model, test_context_cached = self._model_for_test(test_context)
+        context = step_context if test_context_cached else test_context + step_context
+        # Cached prompt tokens still count towards the TPM quota
+        est_tokens = estimate_tokens(
+            PLANNER_SYSTEM_PROMPT + test_context + step_context, PLANNER_IMAGE_MAX_SIZE
+        )
+        return model, context, image_part, est_tokens
+    
+    def seed_cache(
+        self,
+        screenshot_bytes: bytes,
+        test_description: str,
+        expected_result: str,
+        should_pass: bool,
+        previous_actions: Optional[list],
+        action: dict
+    ) -> bool:
+        """
+        Store an action planned elsewhere (e.g. by a batch job) so the
+        matching analyze_and_plan() call returns it without an API call.
+        
+        Returns:
+            True if the action was cached
+        """
+        key = self._cache_key(
+            screenshot_bytes, test_description, expected_result, should_pass, previous_actions
+        )
+        self._cache_put(key, action)
+        return key is not None and action.get("action") not in _TERMINAL_ACTIONS
+    
+    def seed_cache_from(self, other: "PlannerAgent"):
+        """
+        Copy the actions memoized in another planner's memory, e.g. first
+        steps planned by a batch job, so this planner replays them too.
+        
+        Args:
+            other: Planner to copy the cached actions from
+        """
+        for key, action in other._cache.items():
+            self._remember(key, action)
+    
+    def _finish_response(self, response_text: str, action: Optional[dict]) -> dict:
+        """
+        Turn a complete planner response into an action.
+        
+        Args:
+            response_text: Full streamed response text
+            action: Object already parsed while streaming, if any
+        
+        Returns:
+            The planned action
+        
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        logger.debug("Raw planner response: %s", response_text)
+        
+        if action is None:
+            # Nothing complete was found while streaming; decode once more from
+            # the first brace (this also skips a markdown fence) so the error
+            # points at the actual problem
+            start = max(response_text.find("{"), 0)
+            action, _ = _JSON_DECODER.raw_decode(response_text, start)
+            if not isinstance(action, dict):
+                raise json.JSONDecodeError("Expected a JSON object", response_text, start)
+        logger.info(f"Planned action: {action.get('action')} - {action.get('description', '')}")
+        return action
+    
+    def parse_response(self, response_text: str) -> dict:
+        """
+        Parse a complete, non-streamed planner response into an action.
+        
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        return self._finish_response(response_text.strip(), _parse_complete_object(response_text))
+    
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Decide whether a failed API call is retried.
+        
+        Rate limit errors hold back the shared limiter for the delay the
+        server asked for, so the next attempt waits in the rate limiter.
+        
+        Returns:
+            True if the call should be retried
+        """
+        error_str = str(error)
+        
+        # Check if it's a rate limit error (429)
+        if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
+            if attempt < MAX_RETRIES:
+                retry_delay = self._extract_retry_delay(error_str)
+                logger.warning(f"Rate limit hit (attempt {attempt + 1}/{MAX_RETRIES + 1}). Waiting {retry_delay:.1f}s before retry...")
+                self._limiter.penalize(retry_delay)
+                return True
+            logger.error(f"Rate limit exceeded after {MAX_RETRIES + 1} attempts")
+        else:
+            # Non-rate-limit error, don't retry
+            logger.error(f"Planner error: {error}")
+        return False
+    
+    def analyze_and_plan(
+        self, 
+        screenshot_bytes: bytes, 
+        test_description: str,
+        expected_result: str,
+        should_pass: bool,
+        previous_actions: list = None,
+        current_step: int = 1,
+        max_steps: int = 20
+    ) -> dict:
+        """
+        Analyze the current screen and plan the next action.
+        
+        Args:
+            screenshot_bytes: PNG screenshot bytes
+            test_description: The test case description
+            expected_result: Expected outcome of the test
+            should_pass: Whether the test is expected to pass
+            previous_actions: List of previously executed actions
+            current_step: Current step number
+            max_steps: Maximum allowed steps
+        
+        Returns:
+            Dictionary containing the planned action
+        """
+        logger.info(f"Planning step {current_step}/{max_steps}")
+        key = self._cache_key(
+            screenshot_bytes, test_description, expected_result, should_pass, previous_actions
+        )
+        cached = self._cache_get(key, previous_actions)
+        if cached is not None:
+            return cached
+        
+        model, context, image_part, est_tokens = self._build_request(
+            screenshot_bytes, test_description, expected_result, should_pass,
+            previous_actions, current_step, max_steps
+        )
         
         # Retry loop with exponential backoff for rate limiting
         last_error = None
+        retry_note = ""
         for attempt in range(MAX_RETRIES + 1):
+            response_text = ""
             try:
                 # Wait for rate limit before making API call
-                self._wait_for_rate_limit()
-                
-                # Record the API call time
-                self.last_api_call_time = time.time()
+                self._wait_for_rate_limit(est_tokens)
                 
-                # Generate response
-                response = self.model.generate_content([
-                    context,
+                # Stream the response and stop as soon as a complete JSON
+                # object has arrived; trailing tokens are not needed
+                response = model.generate_content([
+                    context + retry_note,
                     image_part
-                ])
-                
-                response_text = response.text.strip()
-                logger.debug(f"Raw planner response: {response_text}")
+                ], stream=True)
                 
-                # Parse JSON response
-                # Handle potential markdown code blocks
-                if response_text.startswith("```"):
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                    response_text = response_text.strip()
-                
-                action = json.loads(response_text)
-                logger.info(f"Planned action: {action.get('action')} - {action.get('description', '')}")
+                action = None
+                for chunk in response:
+                    response_text += chunk.text
+                    # An object can only have completed in a chunk with a "}"
+                    if "}" in chunk.text:
+                        action = _parse_complete_object(response_text)
+                        if action is not None:
+                            break
                 
+                action = self._finish_response(response_text.strip(), action)
+                self._cache_put(key, action)
                 return action
                 
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse planner response as JSON: {e}")
                 logger.error(f"Response was: {response_text}")
-                # Return a safe default action
-                return {
-                    "action": "wait",
-                    "seconds": 1,
-                    "description": "Waiting due to planning error, will retry"
-                }
+                if attempt < MAX_RETRIES:
+                    # Re-submit the same screenshot instead of capturing a new one
+                    retry_note = _INVALID_JSON_NOTE
+                    continue
+                return dict(_PLANNING_ERROR_ACTION)
             except Exception as e:
-                error_str = str(e)
                 last_error = e
-                
-                # Check if it's a rate limit error (429)
-                if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
-                    if attempt < MAX_RETRIES:
-                        retry_delay = self._extract_retry_delay(error_str)
-                        logger.warning(f"Rate limit hit (attempt {attempt + 1}/{MAX_RETRIES + 1}). Waiting {retry_delay:.1f}s before retry...")
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        logger.error(f"Rate limit exceeded after {MAX_RETRIES + 1} attempts")
-                else:
-                    # Non-rate-limit error, don't retry
-                    logger.error(f"Planner error: {e}")
+                if not self._should_retry(e, attempt):
                     break
         
         # All retries exhausted or non-retryable error
-        return {
-            "action": "test_failed",
-            "result": "fail",
-            "reason": f"Planner error after retries: {str(last_error)}",
-            "description": "Internal planner error"
-        }
+        return _planner_failed_action(last_error)
+    
+    async def analyze_and_plan_async(
+        self, 
+        screenshot_bytes: bytes, 
+        test_description: str,
+        expected_result: str,
+        should_pass: bool,
+        previous_actions: list = None,
+        current_step: int = 1,
+        max_steps: int = 20
+    ) -> dict:
+        """
+        Coroutine version of analyze_and_plan().
+        
+        Waiting on the rate limiter and on Gemini does not block the event
+        loop, so several planners (e.g. one per device) can share one loop.
+        Arguments and return value are the same as analyze_and_plan().
+        """
+        logger.info(f"Planning step {current_step}/{max_steps}")
+        key = await asyncio.to_thread(
+            self._cache_key,
+            screenshot_bytes, test_description, expected_result, should_pass, previous_actions
+        )
+        cached = self._cache_get(key, previous_actions)
+        if cached is not None:
+            return cached
+        
+        # Image re-encoding and prompt cache creation block, keep them off the loop
+        model, context, image_part, est_tokens = await asyncio.to_thread(
+            self._build_request,
+            screenshot_bytes, test_description, expected_result, should_pass,
+            previous_actions, current_step, max_steps
+        )
+        
+        last_error = None
+        retry_note = ""
+        for attempt in range(MAX_RETRIES + 1):
+            response_text = ""
+            try:
+                await self._limiter.acquire_async(est_tokens)
+                
+                response = await model.generate_content_async([
+                    context + retry_note,
+                    image_part
+                ], stream=True)
+                
+                action = None
+                async for chunk in response:
+                    response_text += chunk.text
+                    # An object can only have completed in a chunk with a "}"
+                    if "}" in chunk.text:
+                        action = _parse_complete_object(response_text)
+                        if action is not None:
+                            break
+                
+                action = self._finish_response(response_text.strip(), action)
+                self._cache_put(key, action)
+                return action
+            
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse planner response as JSON: {e}")
+                logger.error(f"Response was: {response_text}")
+                if attempt < MAX_RETRIES:
+                    retry_note = _INVALID_JSON_NOTE
+                    continue
+                return dict(_PLANNING_ERROR_ACTION)
+            except Exception as e:
+                last_error = e
+                if not self._should_retry(e, attempt):
+                    break
+        
+        return _planner_failed_action(last_error)
     
     def reset(self):
         """Reset the planner state for a new test."""
-        self.history = []
+        self._release_cache()
         logger.info("PlannerAgent reset")
+    
+    def close(self):
+        """Delete the cached prompt content and close the persistent cache."""
+        self._release_cache()
+        disk_cache, self._disk_cache = self._disk_cache, None
+        if disk_cache is not None:
+            disk_cache.close()
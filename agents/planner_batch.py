@@ -0,0 +1,147 @@
+"""
+Batch Planner for Mobile QA Multi-Agent System
+
+Plans the first step of every test in one Gemini Batch API job, which is
+billed at a discount and does not count against the interactive rate
+limits. Later steps depend on the screen the previous action produced,
+so they are still planned interactively.
+
+The first steps are planned ahead from one screenshot of the freshly
+launched app and stored in the planner's action cache. A test that starts
+from that screen picks its step up in run_test() without an API call. Tests
+run earlier can change where later ones start (test_create_vault leaves a
+vault open, so later tests no longer see the welcome screen); their cache
+keys do not match and they are planned interactively, so only the batch
+request for them is wasted.
+"""
+
+import time
+from typing import List
+from google import genai as genai_batch
+from agents.planner import PlannerAgent, PLANNER_SYSTEM_PROMPT
+from test_cases.obsidian_tests import TestCase
+from config.settings import (
+    GOOGLE_API_KEY,
+    MODEL_NAME,
+    MAX_STEPS,
+    BATCH_POLL_INTERVAL,
+    BATCH_TIMEOUT
+)
+from utils.logger import setup_logger
+
+logger = setup_logger("BatchPlanner")
+
+# Batch job states after which polling stops
+FINISHED_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+class BatchPlanner:
+    """
+    Plans ahead through the Gemini Batch API and seeds a PlannerAgent.
+    """
+    
+    def __init__(self, planner: PlannerAgent):
+        """
+        Initialize the Batch Planner.
+        
+        Args:
+            planner: Planner whose action cache receives the results
+        """
+        self.planner = planner
+        self.client = genai_batch.Client(api_key=GOOGLE_API_KEY)
+    
+    def _build_request(self, test_case: TestCase, screenshot_bytes: bytes) -> dict:
+        """Build the inline batch request for the first step of a test."""
+        test_context, step_context, image_part = self.planner.build_prompt(
+            screenshot_bytes,
+            test_case.description,
+            test_case.expected_result,
+            test_case.should_pass,
+            previous_actions=None,
+            current_step=1,
+            max_steps=MAX_STEPS
+        )
+        return {
+            "contents": [{
+                "role": "user",
+                "parts": [
+                    {"text": test_context + step_context},
+                    {"inline_data": image_part}
+                ]
+            }],
+            "config": {
+                "system_instruction": {"parts": [{"text": PLANNER_SYSTEM_PROMPT}]}
+            }
+        }
+    
+    def _wait_for_job(self, job_name: str):
+        """
+        Poll a batch job until it finishes or BATCH_TIMEOUT passes.
+        
+        Returns:
+            The final job, or None on timeout
+        """
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        while True:
+            job = self.client.batches.get(name=job_name)
+            if job.state.name in FINISHED_STATES:
+                return job
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(BATCH_POLL_INTERVAL)
+    
+    def plan_first_steps(self, test_cases: List[TestCase], screenshot_bytes: bytes) -> int:
+        """
+        Plan the first step of each test in one batch job.
+        
+        Args:
+            test_cases: Tests about to be run
+            screenshot_bytes: Screen of the freshly launched app
+        
+        Returns:
+            Number of tests whose first action was cached
+        """
+        requests = [self._build_request(tc, screenshot_bytes) for tc in test_cases]
+        job = self.client.batches.create(
+            model=MODEL_NAME,
+            src=requests,
+            config={"display_name": f"mobile-qa-first-steps-{int(time.time())}"}
+        )
+        logger.info(f"Submitted batch job {job.name} with {len(requests)} requests")
+        
+        job = self._wait_for_job(job.name)
+        if job is None:
+            logger.warning(f"Batch job not finished after {BATCH_TIMEOUT}s, planning interactively")
+            return 0
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            logger.warning(f"Batch job ended in {job.state.name}, planning interactively")
+            return 0
+        
+        # Inline responses come back in request order
+        seeded = 0
+        for test_case, inline in zip(test_cases, job.dest.inlined_responses):
+            if inline.error or inline.response is None:
+                logger.warning(f"Batch planning failed for {test_case.name}: {inline.error}")
+                continue
+            try:
+                action = self.planner.parse_response(inline.response.text)
+            except ValueError as e:
+                logger.warning(f"Unparseable batch response for {test_case.name}: {e}")
+                continue
+            if self.planner.seed_cache(
+                screenshot_bytes,
+                test_case.description,
+                test_case.expected_result,
+                test_case.should_pass,
+                None,
+                action
+            ):
+                seeded += 1
+        
+        logger.info(f"Batch planned the first step of {seeded}/{len(test_cases)} tests")
+        return seeded
@@ -0,0 +1,129 @@
+"""
+Persistent Planner Cache for Mobile QA Multi-Agent System
+
+Stores planned actions in SQLite so repeat suite runs against the same
+app state replay unchanged screens without calling the API. Entries are
+keyed like the planner's in-memory cache: the screenshot's perceptual
+hash, the test case and the last action taken. Every row also records the
+planner version (system prompt and model), so a prompt or model change
+discards the old answers.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+import orjson
+from utils.logger import setup_logger
+
+logger = setup_logger("PlannerCache")
+
+# Bumped whenever the table layout changes; older tables are dropped
+_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    version INTEGER NOT NULL,
+    phash BLOB NOT NULL,
+    test_hash INTEGER NOT NULL,
+    prev_hash INTEGER NOT NULL,
+    action_json TEXT NOT NULL,
+    PRIMARY KEY (version, phash, test_hash, prev_hash)
+) WITHOUT ROWID
+"""
+
+
+def _stable_hash(value) -> int:
+    """
+    Hash a value to a signed 64-bit integer that is the same in every run.
+    
+    Python's hash() is salted per process, so it cannot key a cache on disk.
+    """
+    digest = hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class PlannerCache:
+    """
+    SQLite-backed store of planned actions.
+    """
+    
+    def __init__(self, db_path: Path, planner_version: str = ""):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Path of the SQLite file
+            planner_version: Anything that changes what the planner answers,
+                e.g. its system prompt and model name. Rows stored under a
+                different version are deleted.
+        """
+        self.db_path = Path(db_path)
+        self._version = _stable_hash(planner_version)
+        # The planner is called from the event loop and from worker threads
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS actions")
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("DELETE FROM actions WHERE version != ?", (self._version,))
+        self._conn.commit()
+        self._lock = threading.Lock()
+        logger.info(f"Persistent planner cache at {self.db_path}")
+    
+    def _row_key(self, key: tuple) -> tuple:
+        """Map a planner cache key to the (version, phash, test_hash, prev_hash) columns."""
+        screen_hash, test_description, expected_result, should_pass, last_action = key
+        return (
+            self._version,
+            screen_hash.to_bytes(16, "big"),
+            _stable_hash((test_description, expected_result, should_pass)),
+            _stable_hash(last_action)
+        )
+    
+    def get(self, key: tuple) -> Optional[dict]:
+        """
+        Look up a stored action.
+        
+        Args:
+            key: Planner cache key
+        
+        Returns:
+            The action, or None if it is not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT action_json FROM actions WHERE version = ? AND phash = ? AND test_hash = ? AND prev_hash = ?",
+                self._row_key(key)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return orjson.loads(row[0])
+        except orjson.JSONDecodeError:
+            return None
+    
+    def put(self, key: tuple, action: dict):
+        """
+        Store an action, replacing any previous one for the key.
+        
+        Args:
+            key: Planner cache key
+            action: Parsed action to store
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO actions VALUES (?, ?, ?, ?, ?)",
+                    self._row_key(key) + (orjson.dumps(action).decode(),)
+                )
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning(f"Could not store planned action: {e}")
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
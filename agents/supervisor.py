@@ -9,16 +9,21 @@ The Supervisor Agent is responsible for:
 5. Distinguishing between step failures and test assertion failures
 """
 
-from typing import List, Dict, Optional
+from typing import Deque, List, Dict, Optional
+from collections import deque
 from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 from datetime import datetime
-import json
+import asyncio
 import time
+import orjson
 
 from agents.planner import PlannerAgent
 from agents.executor import ExecutorAgent
 from test_cases.obsidian_tests import TestCase, TestResult, TestStatus
-from config.settings import MAX_STEPS, SCREENSHOTS_DIR
+from config.settings import MAX_STEPS, SCREENSHOTS_DIR, BATCH_MODE
+from tools.adb_tools import image_extension
+from utils.image_utils import to_png
 from utils.logger import setup_logger
 
 logger = setup_logger("SupervisorAgent")
@@ -35,29 +40,79 @@ class StepRecord:
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
 
+def _write_file(path: str, data: bytes):
+    """Write a screenshot to a file, PNG-encoding raw frames first."""
+    with open(path, 'wb') as f:
+        f.write(to_png(data))
+
+
+def _result_dict(result: TestResult) -> dict:
+    """Convert a TestResult into its exported JSON form."""
+    return {
+        "test_name": result.test_case.name,
+        "description": result.test_case.description,
+        "expected_to_pass": result.test_case.should_pass,
+        "status": result.status.value,
+        "actual_result": result.actual_result,
+        "is_correct": result.is_correct,
+        "steps_executed": result.steps_executed,
+        "screenshots": result.screenshots
+    }
+
+
 class SupervisorAgent:
     """
     Supervisor Agent that orchestrates the QA testing process.
     """
     
-    def __init__(self, device_serial: str = None):
+    def __init__(self, device_serial: str = None, use_cache: bool = True):
         """
         Initialize the Supervisor Agent.
         
         Args:
             device_serial: Optional device serial for ADB connection
+            use_cache: Replay previously planned actions for unchanged screens
         """
-        self.planner = PlannerAgent()
+        self.planner = PlannerAgent(use_cache=use_cache)
         self.executor = ExecutorAgent(device_serial)
         self.current_test: Optional[TestCase] = None
-        self.step_records: List[StepRecord] = []
+        # One test's steps at most; cleared once summarized into its TestResult
+        self.step_records: Deque[StepRecord] = deque(maxlen=MAX_STEPS)
         self.test_results: List[TestResult] = []
+        # One loop for the supervisor's lifetime; the async Gemini client
+        # stays bound to the loop it was first used on
+        self._loop = asyncio.new_event_loop()
+        # Screenshot files are written in the background, off the step loop
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="screenshot-io")
+        self._pending_writes: Dict[Future, StepRecord] = {}
         logger.info("SupervisorAgent initialized")
     
+    def close(self):
+        """Finish pending screenshot writes and release the event loop, I/O threads and planner cache."""
+        self._wait_for_writes()
+        self._io_pool.shutdown()
+        self._loop.close()
+        self.planner.close()
+    
     def run_test(self, test_case: TestCase) -> TestResult:
         """
         Run a single test case.
         
+        Args:
+            test_case: The test case to execute
+        
+        Returns:
+            TestResult object containing the outcome
+        """
+        return self._loop.run_until_complete(self.run_test_async(test_case))
+    
+    async def run_test_async(self, test_case: TestCase) -> TestResult:
+        """
+        Coroutine version of run_test().
+        
+        Planning the next step runs as a task alongside recording the
+        current one, and blocking ADB work runs in worker threads.
+        
         Args:
             test_case: The test case to execute
             
@@ -74,15 +129,15 @@ class SupervisorAgent:
         self.planner.reset()
         self.executor.reset()
         self.current_test = test_case
-        self.step_records = []
+        self.step_records.clear()
         
         # Prepare emulator
-        self.executor.prepare_for_test()
-        time.sleep(1)
+        await asyncio.to_thread(self.executor.prepare_for_test)
+        await asyncio.sleep(1)
         
         # Get initial screenshot
         try:
-            initial_screenshot = self.executor.get_current_screenshot()
+            initial_screenshot = await self.executor.get_current_screenshot_async()
         except Exception as e:
             logger.error(f"Failed to get initial screenshot: {e}")
             return self._create_error_result(test_case, f"Failed to get initial screenshot: {e}")
@@ -93,71 +148,84 @@ class SupervisorAgent:
         final_status = TestStatus.RUNNING
         final_message = ""
         
-        for step in range(1, MAX_STEPS + 1):
-            logger.info(f"\n--- Step {step}/{MAX_STEPS} ---")
-            
-            # 1. Planner decides next action
-            action = self.planner.analyze_and_plan(
-                screenshot_base64=current_screenshot,
-                test_description=test_case.description,
-                expected_result=test_case.expected_result,
-                should_pass=test_case.should_pass,
-                previous_actions=previous_actions,
-                current_step=step,
-                max_steps=MAX_STEPS
-            )
-            
-            # 2. Check for terminal actions
-            action_type = action.get("action", "")
-            
-            if action_type == "test_complete":
-                logger.info(f"✅ TEST COMPLETED: {action.get('description', '')}")
-                final_status = TestStatus.PASSED
-                final_message = action.get("description", "Test completed successfully")
+        # The next planner call runs as a task so it overlaps with recording
+        # the previous step (screenshot write to disk)
+        pending_plan = asyncio.create_task(
+            self._plan_step(test_case, current_screenshot, previous_actions, 1)
+        )
+        
+        try:
+            for step in range(1, MAX_STEPS + 1):
+                logger.info(f"\n--- Step {step}/{MAX_STEPS} ---")
                 
-                # Execute to get final screenshot
-                success, message, screenshot = self.executor.execute(action)
-                self._record_step(step, action, success, message, screenshot)
-                break
+                # 1. Planner decides next action
+                action = await pending_plan
                 
-            elif action_type == "test_failed":
-                reason = action.get("reason", "Unknown reason")
-                logger.warning(f"❌ TEST FAILED: {reason}")
-                final_status = TestStatus.FAILED
-                final_message = reason
+                # 2. Check for terminal actions
+                action_type = action.get("action", "")
                 
-                # Execute to get final screenshot
-                success, message, screenshot = self.executor.execute(action)
-                self._record_step(step, action, success, message, screenshot)
-                break
-            
-            # 3. Executor performs the action
-            success, message, new_screenshot = self.executor.execute(action)
-            
-            # 4. Record the step
-            self._record_step(step, action, success, message, new_screenshot)
-            
-            # 5. Handle execution failures (step failure vs test failure)
-            if not success:
-                logger.warning(f"Step execution failed: {message}")
-                # This is a STEP failure, not necessarily a test failure
-                # We continue and let the planner decide what to do
+                if action_type == "test_complete":
+                    logger.info(f"✅ TEST COMPLETED: {action.get('description', '')}")
+                    final_status = TestStatus.PASSED
+                    final_message = action.get("description", "Test completed successfully")
+                    
+                    # Execute to get final screenshot
+                    success, message, screenshot = await self.executor.execute_async(action)
+                    self._record_step(step, action, success, message, screenshot)
+                    break
+                
+                elif action_type == "test_failed":
+                    reason = action.get("reason", "Unknown reason")
+                    logger.warning(f"❌ TEST FAILED: {reason}")
+                    final_status = TestStatus.FAILED
+                    final_message = reason
+                    
+                    # Execute to get final screenshot
+                    success, message, screenshot = await self.executor.execute_async(action)
+                    self._record_step(step, action, success, message, screenshot)
+                    break
+                
+                # 3. Executor performs the action
+                success, message, new_screenshot = await self.executor.execute_async(action)
+                
+                # 4. Handle execution failures (step failure vs test failure)
+                if not success:
+                    logger.warning(f"Step execution failed: {message}")
+                    # This is a STEP failure, not necessarily a test failure
+                    # We continue and let the planner decide what to do
+                
+                # 5. Update state and start planning the next step right away
+                if new_screenshot:
+                    current_screenshot = new_screenshot
+                previous_actions.append({
+                    "step": step,
+                    "action": action_type,
+                    "description": action.get("description", ""),
+                    "success": success
+                })
+                if step < MAX_STEPS:
+                    pending_plan = asyncio.create_task(self._plan_step(
+                        test_case, current_screenshot, list(previous_actions), step + 1
+                    ))
+                
+                # 6. Record the step while the planner is thinking
+                self._record_step(step, action, success, message, new_screenshot)
             
-            # 6. Update state for next iteration
-            if new_screenshot:
-                current_screenshot = new_screenshot
-            previous_actions.append({
-                "step": step,
-                "action": action_type,
-                "description": action.get("description", ""),
-                "success": success
-            })
-        
-        else:
-            # Max steps reached without conclusion
-            logger.warning(f"Max steps ({MAX_STEPS}) reached without test conclusion")
-            final_status = TestStatus.ERROR
-            final_message = f"Test did not complete within {MAX_STEPS} steps"
+            else:
+                # Max steps reached without conclusion
+                logger.warning(f"Max steps ({MAX_STEPS}) reached without test conclusion")
+                final_status = TestStatus.ERROR
+                final_message = f"Test did not complete within {MAX_STEPS} steps"
+        finally:
+            # A step that raised leaves the next plan running; stop it rather
+            # than waste the Gemini call, and wait for it so its outcome is
+            # retrieved before the loop stops
+            if not pending_plan.done():
+                pending_plan.cancel()
+            await asyncio.gather(pending_plan, return_exceptions=True)
+        
+        # Make sure all screenshots are on disk before listing them
+        await asyncio.to_thread(self._wait_for_writes)
         
         # Create and store result
         result = self._create_result(test_case, final_status, final_message)
@@ -168,6 +236,19 @@ class SupervisorAgent:
         
         return result
     
+    async def _plan_step(self, test_case: TestCase, screenshot: bytes,
+                         previous_actions: list, step: int) -> dict:
+        """Ask the planner for the action to take at the given step."""
+        return await self.planner.analyze_and_plan_async(
+            screenshot_bytes=screenshot,
+            test_description=test_case.description,
+            expected_result=test_case.expected_result,
+            should_pass=test_case.should_pass,
+            previous_actions=previous_actions,
+            current_step=step,
+            max_steps=MAX_STEPS
+        )
+    
     def run_all_tests(self, test_cases: List[TestCase]) -> List[TestResult]:
         """
         Run multiple test cases sequentially.
@@ -182,6 +263,9 @@ class SupervisorAgent:
         logger.info(f"STARTING TEST SUITE: {len(test_cases)} tests")
         logger.info(f"{'#' * 60}\n")
         
+        if BATCH_MODE and self.planner.use_cache:
+            self._plan_first_steps_in_batch(test_cases)
+        
         results = []
         for i, test_case in enumerate(test_cases, 1):
             logger.info(f"\n[{i}/{len(test_cases)}] Running: {test_case.name}")
@@ -196,40 +280,134 @@ class SupervisorAgent:
         
         return results
     
-    def _record_step(self, step: int, action: dict, success: bool, 
-                     message: str, screenshot_b64: str = None):
-        """Record a test step."""
-        screenshot_path = None
-        if screenshot_b64:
-            # Save screenshot
-            filename = f"{self.current_test.name}_step_{step}.png"
-            screenshot_path = str(SCREENSHOTS_DIR / filename)
-            try:
-                import base64
-                with open(screenshot_path, 'wb') as f:
-                    f.write(base64.b64decode(screenshot_b64))
-            except Exception as e:
-                logger.warning(f"Failed to save screenshot: {e}")
-                screenshot_path = None
+    def run_all_tests_parallel(self, test_cases: List[TestCase],
+                               device_serials: List[str]) -> List[TestResult]:
+        """
+        Run multiple test cases sharded across several devices.
+        
+        This supervisor drives its own device and one more supervisor is
+        created per additional serial. Each device pulls the next test from a
+        shared queue. All planners share the process-wide Gemini limiter, so
+        the combined request rate stays within the quota.
+        
+        Args:
+            test_cases: List of test cases to execute
+            device_serials: Serials of the devices to run on
+        
+        Returns:
+            List of TestResult objects, in the order of test_cases
+        """
+        own_serial = self.executor.adb.device_serial
+        workers = [self] + [
+            SupervisorAgent(device_serial=serial, use_cache=self.planner.use_cache)
+            for serial in dict.fromkeys(device_serials) if serial != own_serial
+        ]
+        
+        logger.info(f"\n{'#' * 60}")
+        logger.info(f"STARTING TEST SUITE: {len(test_cases)} tests on {len(workers)} devices")
+        logger.info(f"{'#' * 60}\n")
+        
+        if BATCH_MODE and self.planner.use_cache:
+            self._plan_first_steps_in_batch(test_cases)
+            for worker in workers[1:]:
+                worker.planner.seed_cache_from(self.planner)
+        
+        results: List[Optional[TestResult]] = [None] * len(test_cases)
+        
+        async def drain(worker: "SupervisorAgent", queue: asyncio.Queue):
+            serial = worker.executor.adb.device_serial
+            while not queue.empty():
+                i, test_case = queue.get_nowait()
+                logger.info(f"\n[{i + 1}/{len(test_cases)}] Running on {serial}: {test_case.name}")
+                try:
+                    results[i] = await worker.run_test_async(test_case)
+                except Exception as e:
+                    # Record the crash and keep going; the other devices and
+                    # this device's remaining tests are unaffected
+                    logger.error(f"Test {test_case.name} crashed on {serial}: {e}")
+                    results[i] = worker._create_error_result(test_case, f"Test crashed: {e}")
+                # Brief pause between tests
+                await asyncio.sleep(2)
+        
+        async def run_shards():
+            queue: asyncio.Queue = asyncio.Queue()
+            for item in enumerate(test_cases):
+                queue.put_nowait(item)
+            await asyncio.gather(*(drain(worker, queue) for worker in workers))
+        
+        # Every shard runs on this supervisor's loop, which the async Gemini
+        # client is bound to
+        previous_results = self.test_results[:]
+        try:
+            self._loop.run_until_complete(run_shards())
+        finally:
+            for worker in workers[1:]:
+                worker.close()
+        
+        # In the order of test_cases, not grouped by device
+        self.test_results = previous_results + results
+        self._print_summary(results)
+        
+        return results
+    
+    def _plan_first_steps_in_batch(self, test_cases: List[TestCase]):
+        """
+        Plan the first step of all tests in one Gemini batch job.
+        
+        The steps are planned from one screenshot of the freshly launched app
+        and only reach tests through the action cache, so this is skipped
+        when the cache is off. Tests that start from another screen (because
+        an earlier test changed the app state) and failures of the job are
+        planned interactively as usual.
+        """
+        # Imported here so google-genai is only needed in batch mode
+        from agents.planner_batch import BatchPlanner
         
+        try:
+            self.executor.reset()
+            self.executor.prepare_for_test()
+            time.sleep(1)
+            screenshot = self.executor.get_current_screenshot()
+            BatchPlanner(self.planner).plan_first_steps(test_cases, screenshot)
+        except Exception as e:
+            logger.warning(f"Batch planning failed, planning interactively: {e}")
+    
+    def _record_step(self, step: int, action: dict, success: bool, 
+                     message: str, screenshot: bytes = None):
+        """Record a test step; the screenshot is saved in the background."""
         record = StepRecord(
             step_number=step,
             action=action,
             success=success,
-            message=message,
-            screenshot_path=screenshot_path
+            message=message
         )
+        if screenshot:
+            # Save screenshot
+            filename = f"{self.current_test.name}_step_{step}.{image_extension(screenshot)}"
+            record.screenshot_path = str(SCREENSHOTS_DIR / filename)
+            future = self._io_pool.submit(_write_file, record.screenshot_path, screenshot)
+            self._pending_writes[future] = record
         self.step_records.append(record)
     
+    def _wait_for_writes(self):
+        """Wait for background screenshot writes and drop paths that failed."""
+        pending, self._pending_writes = self._pending_writes, {}
+        wait(pending)
+        for future, record in pending.items():
+            if future.exception() is not None:
+                logger.warning(f"Failed to save screenshot: {future.exception()}")
+                record.screenshot_path = None
+    
     def _create_result(self, test_case: TestCase, status: TestStatus, 
                        message: str) -> TestResult:
         """Create a TestResult object."""
-        steps_executed = [
+        steps_executed = tuple(
             f"Step {r.step_number}: {r.action.get('action', 'unknown')} - {r.action.get('description', '')}"
             for r in self.step_records
-        ]
+        )
         
-        screenshots = [r.screenshot_path for r in self.step_records if r.screenshot_path]
+        screenshots = tuple(r.screenshot_path for r in self.step_records if r.screenshot_path)
+        self.step_records.clear()
         
         return TestResult(
             test_case=test_case,
@@ -245,7 +423,7 @@ class SupervisorAgent:
             test_case=test_case,
             status=TestStatus.ERROR,
             actual_result=error_message,
-            steps_executed=[],
+            steps_executed=(),
             error_message=error_message
         )
     
@@ -276,6 +454,10 @@ class SupervisorAgent:
         logger.info(f"Failed: {failed}")
         logger.info(f"Errors: {errors}")
         logger.info(f"Correct Behavior: {correct}/{total} ({100*correct/total:.1f}%)")
+        if self.planner.use_cache:
+            stats = self.planner.cache_stats()
+            lookups = stats["hits"] + stats["misses"]
+            logger.info(f"Planner Cache: {stats['hits']}/{lookups} hits ({100*stats['hit_ratio']:.1f}%)")
         logger.info("#" * 60)
         
         # Detailed breakdown
@@ -306,23 +488,11 @@ class SupervisorAgent:
         export_data = {
             "timestamp": datetime.now().isoformat(),
             "total_tests": len(self.test_results),
-            "results": [
-                {
-                    "test_name": r.test_case.name,
-                    "description": r.test_case.description,
-                    "expected_to_pass": r.test_case.should_pass,
-                    "status": r.status.value,
-                    "actual_result": r.actual_result,
-                    "is_correct": r.is_correct,
-                    "steps_executed": r.steps_executed,
-                    "screenshots": r.screenshots
-                }
-                for r in self.test_results
-            ]
+            "results": [_result_dict(r) for r in self.test_results]
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Results exported to: {filepath}")
         return filepath
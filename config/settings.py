@@ -2,42 +2,87 @@
 Configuration settings for Mobile QA Multi-Agent System
 """
 
+import functools
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent
 SCREENSHOTS_DIR = PROJECT_ROOT / "screenshots"
 LOGS_DIR = PROJECT_ROOT / "logs"
 
-# Create directories if they don't exist
-SCREENSHOTS_DIR.mkdir(exist_ok=True)
-LOGS_DIR.mkdir(exist_ok=True)
+# Load environment variables (the settings below are read from it at import);
+# an explicit path skips find_dotenv's directory walk
+load_dotenv(PROJECT_ROOT / ".env")
+
+
+@functools.lru_cache(maxsize=None)
+def init_paths():
+    """
+    Create the output directories if they don't exist.
+    
+    Called by the entry point and before the first log file or screenshot
+    is written, so importing the settings alone touches no directories.
+    Repeated calls are free.
+    """
+    SCREENSHOTS_DIR.mkdir(exist_ok=True)
+    LOGS_DIR.mkdir(exist_ok=True)
 
 # API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # Model Configuration
 MODEL_NAME = "gemini-2.5-flash"  # Free tier model
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc")  # "grpc" or "rest"; both keep one connection open
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "20"))  # Requests per minute allowed by the API quota
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "250000"))  # Input tokens per minute allowed by the API quota
+GEMINI_RPD = int(os.getenv("GEMINI_RPD", "0"))  # Requests per day allowed by the API quota (0 for no limit)
+RATE_LIMIT_SAFETY = 0.8  # Fraction of each quota the planner may use
+USE_PROMPT_CACHE = os.getenv("USE_PROMPT_CACHE", "true").lower() == "true"  # Cache system prompt + test context per test
+PROMPT_CACHE_TTL_MINUTES = 30  # Lifetime of a per-test prompt cache
+PLANNER_CACHE_SIZE = int(os.getenv("PLANNER_CACHE_SIZE", "512"))  # Planned actions memoized by screen + test context (0 disables)
+PERSISTENT_PLANNER_CACHE = os.getenv("PERSISTENT_PLANNER_CACHE", "true").lower() == "true"  # Keep planned actions across suite runs
+PLANNER_CACHE_DB = Path(os.getenv("PLANNER_CACHE_DB", str(LOGS_DIR / "planner_cache.db")))  # SQLite file backing the persistent cache
 
 # ADB Configuration
 ADB_PATH = os.getenv("ADB_PATH", "adb")  # Uses system adb by default
+PREREQ_CACHE_FILE = Path.home() / ".cache" / "mobile-qa-agent" / "adb_ok"  # Touched when `adb devices` finds a device
+PREREQ_CACHE_TTL = 60  # Seconds a successful device check is trusted by later runs
 
 # Emulator Configuration
 EMULATOR_SERIAL = os.getenv("EMULATOR_SERIAL", "emulator-5554")
 
+# minicap Configuration (optional fast screen streaming)
+USE_MINICAP = os.getenv("USE_MINICAP", "false").lower() == "true"
+MINICAP_DIR = os.getenv("MINICAP_DIR", str(PROJECT_ROOT / "minicap"))  # minicap-prebuilt layout: <abi>/bin, <abi>/lib/android-<sdk>
+MINICAP_PORT = int(os.getenv("MINICAP_PORT", "0"))  # Local port forwarded to the minicap socket; 0 picks a free one per device
+SCREENSHOT_RAW = os.getenv("SCREENSHOT_RAW", "false").lower() == "true"  # Capture unencoded frames (skips the on-device PNG encode, ~16 MB per frame)
+
 # Screen Configuration (Pixel 8 Pro)
 SCREEN_WIDTH = 1344
 SCREEN_HEIGHT = 2992
 
+# Planner Image Configuration
+PLANNER_IMAGE_FORMAT = "JPEG"  # Format screenshots are re-encoded to before sending to Gemini ("JPEG" or "WEBP")
+PLANNER_IMAGE_QUALITY = 75  # Lossy encoder quality (ignored when lossless)
+PLANNER_IMAGE_LOSSLESS = os.getenv("PLANNER_IMAGE_LOSSLESS", "false").lower() == "true"  # WEBP only
+PLANNER_IMAGE_MAX_SIZE = (896, 1995)  # Bounding box screenshots are shrunk into; Gemini does not need native pixel density
+
 # Agent Configuration
 MAX_STEPS = 20  # Maximum steps per test case
 SCREENSHOT_DELAY = 1.5  # Seconds to wait after action before screenshot (optimized)
+SCREENSHOT_CAPTURE_LEAD = 0.3  # Seconds before the end of SCREENSHOT_DELAY at which screencap is started, hiding its startup
+WAIT_FOR_UI_IDLE = False  # Settle by comparing UI dumps (bounded by SCREENSHOT_DELAY) instead of sleeping; each dump is slow and actions already wait for layout to settle
+UI_CACHE_TTL = 1.5  # Seconds a UI dump is reused by element lookups that have no screenshot to match it against
+WAIT_FOR_SETTLE = True  # End actions as soon as window layout settles (bounded by ACTION_DELAY) instead of sleeping
 ACTION_DELAY = 0.5  # Seconds between actions (optimized for paid tier)
+TEXT_PASTE_THRESHOLD = 30  # Longer (or non-ASCII) text is sent in one go (ADBKeyboard or clipboard paste) instead of typed, where supported
+
+# Batch Mode (plan the first step of every test in one discounted Gemini Batch API job)
+BATCH_MODE = os.getenv("BATCH_MODE", "false").lower() == "true"
+BATCH_POLL_INTERVAL = 30  # Seconds between batch job status checks
+BATCH_TIMEOUT = 1800  # Seconds to wait for a batch job before planning interactively
 
 # Logging
 LOG_LEVEL = "INFO"
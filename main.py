@@ -12,45 +12,94 @@ Usage:
 """
 
 import argparse
+import shutil
+import subprocess
 import sys
+import time
 from datetime import datetime
+from typing import List, Optional, Tuple
 
-from agents.supervisor import SupervisorAgent
 from test_cases.obsidian_tests import (
     ALL_TEST_CASES, 
     get_test_case_by_name,
     get_passing_tests,
     get_failing_tests
 )
-from config.settings import GOOGLE_API_KEY
+from config.settings import GOOGLE_API_KEY, ADB_PATH, PREREQ_CACHE_FILE, PREREQ_CACHE_TTL, init_paths
 from utils.logger import setup_logger
 
 logger = setup_logger("Main")
 
 
-def check_prerequisites():
-    """Check that all prerequisites are met."""
+def _adb_check_cached() -> bool:
+    """Whether a device was seen by a previous run within PREREQ_CACHE_TTL."""
+    try:
+        return time.time() - PREREQ_CACHE_FILE.stat().st_mtime < PREREQ_CACHE_TTL
+    except OSError:
+        return False
+
+
+def _has_online_device(adb_devices_output: str) -> bool:
+    """Whether `adb devices` lists at least one device in the "device" state."""
+    # Skip the "List of devices attached" header; offline and unauthorized
+    # devices are listed too but cannot be used
+    for line in adb_devices_output.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) >= 2 and fields[1] == "device":
+            return True
+    return False
+
+
+def start_prereq_checks() -> Tuple[Optional[subprocess.Popen], List[str]]:
+    """
+    Start the prerequisite checks without waiting for adb.
+    
+    Returns:
+        Tuple of (running `adb devices` process or None, errors found so far)
+    """
     errors = []
     
     # Check API key
     if not GOOGLE_API_KEY:
         errors.append("GOOGLE_API_KEY not set in .env file")
     
-    # Check ADB connection
-    try:
-        import subprocess
-        result = subprocess.run(
-            ["adb", "devices"], 
-            capture_output=True, 
-            text=True, 
-            timeout=5
-        )
-        if "emulator" not in result.stdout and "device" not in result.stdout:
-            errors.append("No Android emulator/device connected. Run: adb devices")
-    except FileNotFoundError:
+    # Check ADB connection in the background
+    if _adb_check_cached():
+        return None, errors
+    # Resolve the binary first so a missing adb costs no fork/exec
+    adb_path = shutil.which(ADB_PATH)
+    if adb_path is None:
         errors.append("ADB not found in PATH. Make sure Android SDK platform-tools is in PATH")
-    except Exception as e:
-        errors.append(f"ADB check failed: {e}")
+        return None, errors
+    proc = subprocess.Popen(
+        [adb_path, "devices"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    return proc, errors
+
+
+def finish_prereq_checks(proc: Optional[subprocess.Popen], errors: List[str]) -> bool:
+    """
+    Wait for the checks started by start_prereq_checks() and report them.
+    
+    Returns:
+        True if all prerequisites are met
+    """
+    if proc is not None:
+        try:
+            stdout, _ = proc.communicate(timeout=5)
+        except subprocess.TimeoutExpired as e:
+            proc.kill()
+            proc.communicate()
+            errors.append(f"ADB check failed: {e}")
+        else:
+            if not _has_online_device(stdout):
+                errors.append("No Android emulator/device connected. Run: adb devices")
+            else:
+                PREREQ_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                PREREQ_CACHE_FILE.touch()
     
     if errors:
         logger.error("Prerequisites check failed:")
@@ -62,31 +111,41 @@ def check_prerequisites():
     return True
 
 
+def check_prerequisites():
+    """Check that all prerequisites are met."""
+    return finish_prereq_checks(*start_prereq_checks())
+
+
 def list_tests():
     """List all available test cases."""
-    print("\n" + "=" * 60)
-    print("AVAILABLE TEST CASES")
-    print("=" * 60)
+    out = [
+        "\n" + "=" * 60 + "\n",
+        "AVAILABLE TEST CASES\n",
+        "=" * 60 + "\n",
+    ]
     
-    print("\n📗 Tests Expected to PASS:")
-    print("-" * 40)
-    for tc in get_passing_tests():
-        print(f"  • {tc.name}")
-        print(f"    {tc.description[:60]}...")
+    for title, tests in (
+        ("📗 Tests Expected to PASS:", get_passing_tests()),
+        ("📕 Tests Expected to FAIL:", get_failing_tests()),
+    ):
+        out.append(f"\n{title}\n")
+        out.append("-" * 40 + "\n")
+        for tc in tests:
+            out.append(f"  • {tc.name}\n")
+            out.append(f"    {tc.short_description}\n")
     
-    print("\n📕 Tests Expected to FAIL:")
-    print("-" * 40)
-    for tc in get_failing_tests():
-        print(f"  • {tc.name}")
-        print(f"    {tc.description[:60]}...")
+    out.append("\n" + "=" * 60 + "\n")
+    out.append(f"Total: {len(ALL_TEST_CASES)} tests\n")
+    out.append("=" * 60 + "\n\n")
     
-    print("\n" + "=" * 60)
-    print(f"Total: {len(ALL_TEST_CASES)} tests")
-    print("=" * 60 + "\n")
+    # One write instead of a syscall per line
+    sys.stdout.write("".join(out))
 
 
-def run_specific_test(test_name: str):
+def run_specific_test(test_name: str, use_cache: bool = True):
     """Run a specific test by name."""
+    from agents.supervisor import SupervisorAgent
+    
     test_case = get_test_case_by_name(test_name)
     
     if test_case is None:
@@ -96,23 +155,40 @@ def run_specific_test(test_name: str):
             logger.info(f"  - {tc.name}")
         return None
     
-    supervisor = SupervisorAgent()
-    result = supervisor.run_test(test_case)
-    supervisor.export_results()
+    supervisor = SupervisorAgent(use_cache=use_cache)
+    try:
+        result = supervisor.run_test(test_case)
+        supervisor.export_results()
+    finally:
+        supervisor.close()
     
     return result
 
 
-def run_all_tests():
-    """Run all available tests."""
-    supervisor = SupervisorAgent()
-    results = supervisor.run_all_tests(ALL_TEST_CASES)
-    supervisor.export_results()
+def _run_suite(test_cases: list, use_cache: bool = True, devices: list = None):
+    """Run a list of tests, sharded across devices when more than one is given."""
+    from agents.supervisor import SupervisorAgent
+    
+    devices = devices or []
+    supervisor = SupervisorAgent(devices[0] if devices else None, use_cache=use_cache)
+    try:
+        if len(devices) > 1:
+            results = supervisor.run_all_tests_parallel(test_cases, devices)
+        else:
+            results = supervisor.run_all_tests(test_cases)
+        supervisor.export_results()
+    finally:
+        supervisor.close()
     
     return results
 
 
-def run_demo_tests():
+def run_all_tests(use_cache: bool = True, devices: list = None):
+    """Run all available tests."""
+    return _run_suite(ALL_TEST_CASES, use_cache, devices)
+
+
+def run_demo_tests(use_cache: bool = True, devices: list = None):
     """Run a smaller demo set of tests (2 pass, 2 fail)."""
     demo_tests = [
         get_test_case_by_name("test_create_vault"),      # Should PASS
@@ -121,11 +197,7 @@ def run_demo_tests():
         get_test_case_by_name("test_print_to_pdf"),      # Should FAIL
     ]
     
-    supervisor = SupervisorAgent()
-    results = supervisor.run_all_tests(demo_tests)
-    supervisor.export_results()
-    
-    return results
+    return _run_suite(demo_tests, use_cache, devices)
 
 
 def main():
@@ -158,8 +230,20 @@ def main():
         action="store_true",
         help="Skip prerequisite checks"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always ask the planner model instead of replaying cached actions"
+    )
+    parser.add_argument(
+        "--devices",
+        type=str,
+        help="Comma-separated device serials to shard the suite across"
+    )
     
     args = parser.parse_args()
+    init_paths()
+    devices = [d.strip() for d in args.devices.split(",") if d.strip()] if args.devices else None
     
     # Print banner
     print("\n" + "=" * 60)
@@ -172,32 +256,35 @@ def main():
         list_tests()
         return 0
     
-    # Check prerequisites
+    # Check prerequisites; adb runs while the agents (and Google ADK) import
+    if not args.skip_checks:
+        checks = start_prereq_checks()
+    import agents.supervisor  # noqa: F401
     if not args.skip_checks:
-        if not check_prerequisites():
+        if not finish_prereq_checks(*checks):
             return 1
     
     # Determine what to run
     try:
         if args.test:
             logger.info(f"Running specific test: {args.test}")
-            result = run_specific_test(args.test)
+            result = run_specific_test(args.test, use_cache=not args.no_cache)
             if result is None:
                 return 1
                 
         elif args.demo:
             logger.info("Running demo tests (4 tests)")
-            results = run_demo_tests()
+            results = run_demo_tests(use_cache=not args.no_cache, devices=devices)
             
         elif args.all:
             logger.info("Running all tests")
-            results = run_all_tests()
+            results = run_all_tests(use_cache=not args.no_cache, devices=devices)
             
         else:
             # Default: run demo
             logger.info("No option specified. Running demo tests.")
             logger.info("Use --help for more options.")
-            results = run_demo_tests()
+            results = run_demo_tests(use_cache=not args.no_cache, devices=devices)
         
         logger.info("\n✅ Test execution completed!")
         return 0
@@ -9,10 +9,20 @@ Each test case includes:
 - should_pass: Whether the test is expected to pass or fail
 """
 
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 from enum import Enum
 
+__all__ = [
+    "ALL_TEST_CASES",
+    "get_test_case_by_name",
+    "get_passing_tests",
+    "get_failing_tests",
+    "TestCase",
+    "TestResult",
+    "TestStatus",
+]
+
 
 class TestStatus(Enum):
     """Test execution status"""
@@ -23,33 +33,30 @@ class TestStatus(Enum):
     ERROR = "error"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestCase:
     """Represents a single QA test case"""
     name: str
     description: str
     expected_result: str
     should_pass: bool
-    steps: List[str] = None  # Optional detailed steps
+    steps: Tuple[str, ...] = ()  # Optional detailed steps
+    short_description: str = field(init=False, repr=False, compare=False)  # For listings
     
     def __post_init__(self):
-        if self.steps is None:
-            self.steps = []
+        short = self.description[:60] + "..." if len(self.description) > 60 else self.description
+        object.__setattr__(self, "short_description", short)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestResult:
     """Represents the result of a test execution"""
     test_case: TestCase
     status: TestStatus
     actual_result: str
-    steps_executed: List[str]
-    error_message: str = None
-    screenshots: List[str] = None
-    
-    def __post_init__(self):
-        if self.screenshots is None:
-            self.screenshots = []
+    steps_executed: Tuple[str, ...]
+    error_message: Optional[str] = None
+    screenshots: Tuple[str, ...] = ()
     
     @property
     def is_correct(self) -> bool:
@@ -70,7 +77,7 @@ TEST_CREATE_VAULT = TestCase(
     description="Create vault: 1) Tap purple 'Create a vault' 2) Tap purple 'Continue without sync' 3) Clear vault name field, type 'InternVault' 4) Tap purple 'Create a vault' 5) Tap blue 'USE THIS FOLDER' 6) Tap 'ALLOW'. Then verify main vault interface.",
     expected_result="Vault 'InternVault' created and main Obsidian interface visible (New tab or notes list).",
     should_pass=True,
-    steps=[
+    steps=(
         "Tap purple 'Create a vault' button",
         "Tap purple 'Continue without sync' button",
         "Tap vault name field and clear it",
@@ -79,7 +86,7 @@ TEST_CREATE_VAULT = TestCase(
         "Tap blue 'USE THIS FOLDER' button",
         "Tap 'ALLOW' button",
         "Report TEST_COMPLETE when vault interface visible"
-    ]
+    )
 )
 
 # Test Case 2: Create a new note (Should PASS)
@@ -88,13 +95,13 @@ TEST_CREATE_NOTE = TestCase(
     description="Create a new note titled 'Meeting Notes' with body text 'Daily Standup'. Steps: 1) Tap 'Create new note' or the + icon 2) Type 'Meeting Notes' as the title (first line) 3) Press Enter 4) Type 'Daily Standup' as the body content. Report TEST_COMPLETE when done.",
     expected_result="A note titled 'Meeting Notes' with body 'Daily Standup' should be created. Report TEST_COMPLETE once the text is typed.",
     should_pass=True,
-    steps=[
+    steps=(
         "Tap the 'Create new note' button or + icon in the vault interface",
         "Type 'Meeting Notes' as the note title (first line)",
         "Press Enter to move to the body",
         "Type 'Daily Standup' as the body content",
         "Report TEST_COMPLETE when text has been entered"
-    ]
+    )
 )
 
 # Test Case 3: Verify Appearance tab icon color (Should FAIL)
@@ -103,13 +110,13 @@ TEST_APPEARANCE_ICON_COLOR = TestCase(
     description="Verify Appearance accent color is RED. Steps: 1) Tap top-left icon (x=112, y=240) to go back to file browser 2) Tap the settings gear icon at EXACT coordinates (x=1138, y=280) - this is the purple gear in top-right 3) Tap 'Appearance' text 4) Check 'Accent color' - it is PURPLE, not RED. Report TEST_FAILED.",
     expected_result="The test should FAIL because the Appearance accent color is purple, NOT red.",
     should_pass=False,
-    steps=[
+    steps=(
         "Tap top-left icon at (x=112, y=240) to go back to file browser",
         "Tap settings gear icon at EXACT (x=1138, y=280)",
         "Tap 'Appearance' in Settings menu",
         "Look at 'Accent color' - it is PURPLE, not RED",
         "Report TEST_FAILED because accent color is NOT red"
-    ]
+    )
 )
 
 # Test Case 4: Find Print to PDF button (Should FAIL)
@@ -118,12 +125,12 @@ TEST_PRINT_TO_PDF = TestCase(
     description="Find and click the 'Print to PDF' button in the main file menu. Steps: 1) Tap the three-dots menu icon (⋮) at EXACT coordinates (x=1260, y=2900) - this is the bottom-right corner of the toolbar 2) Look through the menu options for 'Print to PDF' 3) It does NOT exist in mobile - report TEST_FAILED.",
     expected_result="The test should FAIL because 'Print to PDF' feature does not exist in the mobile version's menu.",
     should_pass=False,
-    steps=[
+    steps=(
         "Tap the three-dots menu icon (⋮) at EXACT coordinates (x=1260, y=2900) in bottom-right",
         "Look through all menu options for 'Print to PDF'",
         "The option does NOT exist in the mobile version",
         "Report TEST_FAILED because 'Print to PDF' was not found in the menu"
-    ]
+    )
 )
 
 # Test Case 5: Search functionality (Should PASS)
@@ -132,12 +139,12 @@ TEST_SEARCH_FUNCTIONALITY = TestCase(
     description="Use the search feature to search for 'Meeting' and verify search results appear.",
     expected_result="Search results should display any notes containing 'Meeting' in their title or content.",
     should_pass=True,
-    steps=[
+    steps=(
         "Ensure we have at least one note with 'Meeting' in it",
         "Find and tap the search icon",
         "Type 'Meeting' in the search field",
         "Verify that search results are displayed"
-    ]
+    )
 )
 
 # Test Case 6: Toggle dark mode (Should PASS)
@@ -146,13 +153,13 @@ TEST_TOGGLE_DARK_MODE = TestCase(
     description="Go to Settings > Appearance and toggle the dark/light mode theme.",
     expected_result="The app theme should visibly change between dark and light mode.",
     should_pass=True,
-    steps=[
+    steps=(
         "Open Settings",
         "Navigate to Appearance settings",
         "Find theme or dark mode toggle",
         "Toggle the theme setting",
         "Verify the visual change in the app"
-    ]
+    )
 )
 
 # Test Case 7: Non-existent plugin (Should FAIL)
@@ -161,12 +168,12 @@ TEST_NONEXISTENT_PLUGIN = TestCase(
     description="Enable the 'Calendar View' core plugin from the settings.",
     expected_result="The test should FAIL because 'Calendar View' is not a core plugin in Obsidian mobile.",
     should_pass=False,
-    steps=[
+    steps=(
         "Open Settings",
         "Navigate to Core plugins section",
         "Look for 'Calendar View' plugin",
         "Report FAIL when plugin is not found"
-    ]
+    )
 )
 
 
@@ -182,19 +189,22 @@ ALL_TEST_CASES = [
 ]
 
 
-def get_test_case_by_name(name: str) -> TestCase:
+# Lookup tables built once from ALL_TEST_CASES
+_TEST_BY_NAME: Dict[str, TestCase] = {tc.name: tc for tc in ALL_TEST_CASES}
+_PASSING: Tuple[TestCase, ...] = tuple(tc for tc in ALL_TEST_CASES if tc.should_pass)
+_FAILING: Tuple[TestCase, ...] = tuple(tc for tc in ALL_TEST_CASES if not tc.should_pass)
+
+
+def get_test_case_by_name(name: str) -> Optional[TestCase]:
     """Get a test case by its name."""
-    for tc in ALL_TEST_CASES:
-        if tc.name == name:
-            return tc
-    return None
+    return _TEST_BY_NAME.get(name)
 
 
-def get_passing_tests() -> List[TestCase]:
+def get_passing_tests() -> Tuple[TestCase, ...]:
     """Get all test cases that should pass."""
-    return [tc for tc in ALL_TEST_CASES if tc.should_pass]
+    return _PASSING
 
 
-def get_failing_tests() -> List[TestCase]:
+def get_failing_tests() -> Tuple[TestCase, ...]:
     """Get all test cases that should fail."""
-    return [tc for tc in ALL_TEST_CASES if not tc.should_pass]
+    return _FAILING
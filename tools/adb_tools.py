@@ -5,58 +5,207 @@ This module provides tools for interacting with the Android emulator
 using ADB (Android Debug Bridge) commands.
 """
 
+import asyncio
 import subprocess
-import base64
+import binascii
+import functools
+import hashlib
+import logging
+import os
+import select
+import selectors
+import threading
 import time
+import uuid
 import re
-import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Optional, Tuple, Dict, List
+from typing import Callable, Optional, Tuple, Dict, List
 from config.settings import (
     ADB_PATH, 
     EMULATOR_SERIAL, 
     SCREENSHOTS_DIR,
+    SCREENSHOT_RAW,
     SCREENSHOT_DELAY,
     ACTION_DELAY,
+    TEXT_PASTE_THRESHOLD,
     SCREEN_WIDTH,
-    SCREEN_HEIGHT
+    SCREEN_HEIGHT,
+    UI_CACHE_TTL,
+    WAIT_FOR_SETTLE,
+    USE_MINICAP
 )
+from tools.minicap import MinicapStream
+from utils.image_utils import to_png
 from utils.logger import setup_logger
 
+try:
+    import pybase64  # SIMD base64; optional
+except ImportError:
+    pybase64 = None
+
+try:
+    from lxml import etree  # libxml2 parser; optional
+except ImportError:
+    import xml.etree.ElementTree as etree
+
 logger = setup_logger("ADBTools")
 
 
+# Spaces become %s for `input text`; shell metacharacters get a backslash
+_INPUT_TEXT_ESCAPES = str.maketrans({
+    " ": "%s",
+    "'": "\\'",
+    '"': '\\"',
+    "&": "\\&",
+    "<": "\\<",
+    ">": "\\>",
+    ";": "\\;",
+    "(": "\\(",
+    ")": "\\)",
+    "|": "\\|",
+})
+
+
+# Lines of interest in `dumpsys window windows` and `wm size` output
+# (bytes patterns, matched against the raw output without decoding it)
+_CURRENT_FOCUS_RE = re.compile(rb"mCurrentFocus=.*")
+_PHYSICAL_SIZE_RE = re.compile(rb"Physical size:\s*(\d+)x(\d+)")
+_TRAVERSAL_SCHEDULED_RE = re.compile(rb"mTraversalScheduled=(true|false)")
+# Filters the focused window line on the device, so only that line is sent back
+# (`|| true` keeps grep's "no match" exit status from being logged)
+_CURRENT_FOCUS_CMD = ["dumpsys", "window", "windows", "|", "grep", "-m", "1", "mCurrentFocus", "||", "true"]
+# Input method id of the ADBKeyboard app, which types broadcast text in one go
+_ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+_BOUNDS_RE = re.compile(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]")
+
+# get_device_info() keys and the system properties they come from, read in one shell call
+_DEVICE_PROPS = (
+    ("model", "ro.product.model"),
+    ("android_version", "ro.build.version.release"),
+    ("sdk_version", "ro.build.version.sdk"),
+)
+_DEVICE_INFO_SCRIPT = "; ".join(f"getprop {prop}" for _, prop in _DEVICE_PROPS)
+
+
+def _parse_device_info(output: str) -> dict:
+    """Map the lines printed by _DEVICE_INFO_SCRIPT to their keys (one line per property)."""
+    lines = output.split("\n")
+    lines += [""] * (len(_DEVICE_PROPS) - len(lines))
+    return {key: line.strip() for (key, _), line in zip(_DEVICE_PROPS, lines)}
+
+
+def escape_input_text(text: str) -> str:
+    """
+    Escape text for `adb shell input text`.
+    
+    Args:
+        text: Text to type
+    
+    Returns:
+        Text with spaces and shell metacharacters escaped
+    """
+    return text.translate(_INPUT_TEXT_ESCAPES)
+
+
+def image_extension(image_bytes: bytes) -> str:
+    """
+    Pick a file extension for captured screenshot bytes.
+    
+    Args:
+        image_bytes: PNG or raw frame from screencap, or JPEG from minicap
+    
+    Returns:
+        "jpg" or "png" (raw frames are saved as PNG)
+    """
+    return "jpg" if image_bytes[:3] == b"\xff\xd8\xff" else "png"
+
+
+def _b64_ascii(data) -> str:
+    """Base64-encode a bytes-like object into a str."""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+
 class ADBTools:
     """
     A class providing ADB tools for Android emulator interaction.
     """
     
-    def __init__(self, device_serial: str = None):
+    def __init__(self, device_serial: str = None, verify: bool = False):
         """
         Initialize ADB Tools.
         
         Args:
             device_serial: The serial number of the target device/emulator
+            verify: Check the connection before returning; otherwise it is
+                checked in the background. Either way, the first shell command
+                raises if the device was not found.
         """
         self.device_serial = device_serial or EMULATOR_SERIAL
-        self.adb_prefix = [ADB_PATH, "-s", self.device_serial]
-        self._verify_connection()
+        self.adb_prefix: Tuple[str, ...] = (ADB_PATH, "-s", self.device_serial)
+        self._shell_proc: Optional[subprocess.Popen] = None
+        # One command at a time on the shared session, so instances can be shared between threads
+        self._shell_lock = threading.Lock()
+        self._ui_cache: Optional[Tuple[Optional[bytes], str, float]] = None  # (frame_key, ui_xml, validated at)
+        self._ui_nodes: Optional[Tuple[str, list]] = None  # (ui_xml, its parsed <node> elements)
+        # Receive buffer reused by every capture; grows to the largest screenshot seen
+        self._capture_buf = bytearray(SCREEN_WIDTH * SCREEN_HEIGHT)
+        self._capture_lock = threading.Lock()
+        # Fixed for the device's lifetime, so read once and kept
+        self._screen_size: Optional[Tuple[int, int]] = None
+        self._device_info: Optional[dict] = None
+        self._ui_dump_streams = True  # False once the device refuses to dump to stdout
+        self._settle_polling = WAIT_FOR_SETTLE  # False once the device turns out not to report layout state
+        self._can_paste = True  # False once setting the clipboard from the shell has failed
+        self._adbkeyboard_available: Optional[bool] = None  # Whether ADBKeyboard is the active IME; checked on first use
+        # Set once the first connection check has finished; shell commands wait
+        # for it, so the check cannot reset cached info they are filling in
+        self._connected = False
+        self._connection_checked = threading.Event()
+        if verify:
+            self._verify_connection()
+        else:
+            threading.Thread(target=self._verify_connection, daemon=True).start()
+        self._minicap: Optional[MinicapStream] = None
+        if USE_MINICAP:
+            self.start_screenshot_stream()
     
     def _verify_connection(self) -> bool:
         """Verify ADB connection to the device."""
         try:
             result = self._run_command(["devices"])
-            if self.device_serial in result:
+            if self.device_serial.encode() in result:
                 logger.info(f"Connected to device: {self.device_serial}")
+                self._connected = True
+                self._connection_checked.set()
                 return True
             else:
                 logger.warning(f"Device {self.device_serial} not found in: {result}")
-                return False
         except Exception as e:
             logger.error(f"Failed to verify ADB connection: {e}")
-            return False
+        # The serial may now belong to a different device
+        with self._shell_lock:
+            self._screen_size = None
+            self._device_info = None
+        self._connection_checked.set()
+        return False
     
-    def _run_command(self, args: list, use_prefix: bool = True) -> str:
+    def _ensure_connected(self):
+        """
+        Wait for the connection check started in __init__ and, if it did not
+        find the device, check once more.
+        
+        Raises:
+            RuntimeError: If the device is still not connected
+        """
+        if self._connected:
+            return
+        self._connection_checked.wait()
+        if not self._connected and not self._verify_connection():
+            raise RuntimeError(f"Device {self.device_serial} is not connected")
+    
+    def _run_command(self, args: list, use_prefix: bool = True) -> bytes:
         """
         Run an ADB command and return the output.
         
@@ -65,20 +214,20 @@ class ADBTools:
             use_prefix: Whether to use the device-specific prefix
             
         Returns:
-            Command output as string
+            Raw command output; callers decode only what they return
         """
-        cmd = self.adb_prefix + args if use_prefix else [ADB_PATH] + args
-        logger.debug(f"Running command: {' '.join(cmd)}")
+        cmd = [*self.adb_prefix, *args] if use_prefix else [ADB_PATH, *args]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Running command: %s", " ".join(cmd))
         
         try:
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True,
                 timeout=30
             )
             if result.returncode != 0 and result.stderr:
-                logger.warning(f"Command stderr: {result.stderr}")
+                logger.warning(f"Command stderr: {result.stderr.decode(errors='replace')}")
             return result.stdout
         except subprocess.TimeoutExpired:
             logger.error(f"Command timed out: {' '.join(cmd)}")
@@ -87,58 +236,347 @@ class ADBTools:
             logger.error(f"Command failed: {e}")
             raise
     
-    def _run_shell_command(self, args: list) -> str:
-        """Run an ADB shell command."""
-        return self._run_command(["shell"] + args)
+    def _run_shell_command(self, args: list, text: bool = True):
+        """Run an ADB shell command, returning str, or bytes if text is False."""
+        output = self._run_command(["shell"] + args)
+        return output.decode("utf-8", errors="replace") if text else output
+    
+    async def _run_command_async(self, args: list, timeout: float = 30) -> bytes:
+        """
+        Coroutine version of _run_command() for concurrent one-off commands.
+        
+        Args:
+            args: Command arguments after the device prefix
+            timeout: Seconds to wait for the command
+        
+        Returns:
+            Raw command output
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *self.adb_prefix, *args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(args, timeout)
+        if proc.returncode != 0 and stderr:
+            logger.warning(f"Command stderr: {stderr.decode(errors='replace')}")
+        return stdout
+    
+    # ==================== Persistent Shell ====================
+    
+    def _ensure_shell(self) -> subprocess.Popen:
+        """Start the long-lived `adb shell` session if it is not running."""
+        if self._shell_proc is None or self._shell_proc.poll() is not None:
+            logger.debug("Starting persistent adb shell for %s", self.device_serial)
+            self._shell_proc = subprocess.Popen(
+                [*self.adb_prefix, "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0
+            )
+        return self._shell_proc
+    
+    def _send(self, cmd: str, timeout: float = 30) -> Tuple[bytes, int]:
+        """
+        Run a command in the persistent shell and wait for it to finish.
+        
+        The command is followed by an echo of a unique sentinel and its exit
+        status; output is read in large chunks straight from the pipe until
+        the sentinel line comes back.
+        
+        Args:
+            cmd: Shell command line
+            timeout: Seconds to wait for the command
+        
+        Returns:
+            Tuple of (raw output, exit_code)
+        """
+        shell = self._ensure_shell()
+        sentinel = f"__END_{uuid.uuid4().hex}__".encode()
+        os.write(shell.stdin.fileno(), cmd.encode() + b"; echo " + sentinel + b"$?\n")
+        
+        fd = shell.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        output = bytearray()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("Persistent adb shell exited unexpectedly")
+            output += chunk
+            # Only the tail can hold the sentinel line
+            idx = output.find(sentinel, max(0, len(output) - len(chunk) - len(sentinel)))
+            if idx != -1:
+                end = output.find(b"\n", idx)
+                if end != -1:
+                    exit_code = int(output[idx + len(sentinel):end].strip() or 0)
+                    return bytes(output[:idx]), exit_code
+    
+    def _run_in_shell(self, args: list, mutates: bool = True, text: bool = True):
+        """
+        Run a command through the persistent shell, avoiding a new adb
+        process per call. Falls back to a one-off `adb shell` on failure.
+        
+        Args:
+            args: Command arguments, joined with spaces like `adb shell` does
+            mutates: Whether the command can change the screen (input, app
+                start/stop), which makes the cached UI dump stale
+            text: Decode the output; pass False to scan large output as bytes
+        
+        Returns:
+            Command output as string, or bytes if text is False
+        """
+        self._ensure_connected()
+        if mutates:
+            self._ui_cache = None
+        cmd = " ".join(args)
+        with self._shell_lock:
+            try:
+                output, exit_code = self._send(cmd)
+            except subprocess.TimeoutExpired:
+                # The session is stuck behind the command; start a fresh one next time
+                logger.error(f"Command timed out: {cmd}")
+                self._close_shell()
+                raise
+            except (OSError, RuntimeError, ValueError) as e:
+                logger.warning(f"Persistent shell failed ({e}), falling back to adb shell")
+                self._close_shell()
+                return self._run_shell_command(args, text)
+        if exit_code != 0:
+            logger.warning(f"Command exited with {exit_code}: {cmd}")
+        return output.decode("utf-8", errors="replace") if text else output
+    
+    def close(self):
+        """Terminate the persistent shell session and the minicap stream."""
+        minicap, self._minicap = getattr(self, "_minicap", None), None
+        if minicap is not None:
+            minicap.close()
+        self._close_shell()
+    
+    def _close_shell(self):
+        """Terminate the persistent shell session."""
+        proc, self._shell_proc = self._shell_proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.write(b"exit\n")
+            proc.stdin.flush()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
     
     # ==================== Screenshot Tools ====================
     
-    def take_screenshot(self, filename: str = None) -> Tuple[str, bytes]:
+    def take_screenshot(self, filename: str = None, save: bool = True) -> Tuple[Optional[str], bytes]:
         """
         Take a screenshot of the device screen.
         
         Args:
             filename: Optional filename for saving the screenshot
+            save: Whether to write the screenshot to SCREENSHOTS_DIR
             
         Returns:
-            Tuple of (filepath, image_bytes)
+            Tuple of (filepath or None if not saved, image_bytes)
         """
-        if filename is None:
-            filename = f"screenshot_{int(time.time())}.png"
-        
-        filepath = SCREENSHOTS_DIR / filename
-        
         try:
-            # Use exec-out for direct binary output
-            cmd = self.adb_prefix + ["exec-out", "screencap", "-p"]
-            result = subprocess.run(cmd, capture_output=True, timeout=10)
+            image_bytes = self.get_screenshot_bytes()
+            if not save:
+                return None, image_bytes
             
-            if result.returncode == 0:
-                image_bytes = result.stdout
-                
-                # Save to file
-                with open(filepath, 'wb') as f:
-                    f.write(image_bytes)
-                
-                logger.info(f"Screenshot saved: {filepath}")
-                return str(filepath), image_bytes
-            else:
-                logger.error(f"Screenshot failed: {result.stderr}")
-                raise Exception("Failed to capture screenshot")
-                
+            if filename is None:
+                filename = f"screenshot_{int(time.time())}.{image_extension(image_bytes)}"
+            filepath = SCREENSHOTS_DIR / filename
+            
+            # Save to file with plain os.write calls; no buffered writer needed
+            # for a single large write
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                view = memoryview(to_png(image_bytes))
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+            
+            logger.info(f"Screenshot saved: {filepath}")
+            return str(filepath), image_bytes
+        
         except Exception as e:
             logger.error(f"Screenshot error: {e}")
             raise
     
+    def start_screenshot_stream(self) -> bool:
+        """
+        Start streaming frames from minicap, if it is not running already.
+        
+        While the stream runs, screenshots return its latest frame instead
+        of starting `screencap`. Started automatically with USE_MINICAP.
+        
+        Returns:
+            True if frames are streaming, False if minicap is unavailable
+        """
+        if self._minicap is not None:
+            return True
+        stream = MinicapStream(self.adb_prefix, self.get_screen_size())
+        if not stream.start():
+            return False
+        self._minicap = stream
+        return True
+    
+    def start_screenshot(self, raw: bool = SCREENSHOT_RAW) -> Optional[subprocess.Popen]:
+        """
+        Start capturing a screenshot in the background.
+        
+        The image is streamed straight from `exec-out screencap`, so no
+        intermediate file is written to device storage and pulled back.
+        Pair with finish_screenshot() to collect the result.
+        
+        Args:
+            raw: Capture the unencoded frame instead of a PNG; skips the
+                on-device PNG encode at the cost of moving more bytes
+        
+        Returns:
+            Handle of the running capture process, or None when minicap
+            is streaming and finish_screenshot() will use its latest frame
+        """
+        if not raw and self._minicap is not None and self._minicap.latest_frame() is not None:
+            return None
+        cmd = [*self.adb_prefix, "exec-out", "screencap"] if raw else [*self.adb_prefix, "exec-out", "screencap", "-p"]
+        # Unbuffered, so stdout reads go straight into the receive buffer
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    
+    def _read_capture(self, proc: subprocess.Popen, convert: Callable = bytes,
+                      timeout: float = 10):
+        """
+        Read a capture's output through the reusable receive buffer.
+        
+        Each read lands directly in the buffer, and the result is produced
+        straight from it, so the only allocation per screenshot is the
+        returned object.
+        
+        Args:
+            proc: Capture process started by start_screenshot()
+            convert: Turns a view of the captured bytes into the result
+            timeout: Seconds to wait for the capture to finish
+        
+        Returns:
+            convert() of the captured image
+        """
+        deadline = time.monotonic() + timeout
+        with self._capture_lock, selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ)
+            size = 0
+            while True:
+                if size == len(self._capture_buf):
+                    self._capture_buf.extend(bytes(len(self._capture_buf)))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    raise subprocess.TimeoutExpired(proc.args, timeout)
+                with memoryview(self._capture_buf) as view:
+                    read = proc.stdout.readinto(view[size:])
+                if not read:
+                    break
+                size += read
+            with memoryview(self._capture_buf) as view:
+                return convert(view[:size])
+    
+    def finish_screenshot(self, proc: Optional[subprocess.Popen]) -> bytes:
+        """
+        Wait for a capture started by start_screenshot().
+        
+        Args:
+            proc: Handle returned by start_screenshot()
+        
+        Returns:
+            PNG image bytes (JPEG when streaming from minicap, raw frame
+            when started with raw=True)
+        """
+        return self._finish_capture(proc, bytes)
+    
+    def _finish_capture(self, proc: Optional[subprocess.Popen], convert: Callable):
+        """
+        Wait for a capture and convert the image straight from the receive buffer.
+        
+        Args:
+            proc: Handle returned by start_screenshot()
+            convert: Turns a view of the image bytes into the result
+        
+        Returns:
+            convert() of the captured image
+        """
+        if proc is None:
+            frame = self._minicap.latest_frame() if self._minicap is not None else None
+            if frame is not None:
+                return convert(memoryview(frame))
+            proc = self.start_screenshot()
+        try:
+            result = self._read_capture(proc, convert)
+            stderr = proc.stderr.read()
+            proc.wait()
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            proc.stdout.close()
+            proc.stderr.close()
+        if proc.returncode != 0:
+            logger.error(f"Screenshot failed: {stderr}")
+            raise Exception("Failed to capture screenshot")
+        return result
+    
+    def get_screenshot_bytes(self) -> bytes:
+        """
+        Capture the screen and return the raw image bytes.
+        
+        Returns:
+            PNG image bytes (JPEG when streaming from minicap)
+        """
+        return self.finish_screenshot(self.start_screenshot())
+    
+    async def get_screenshot_bytes_async(self) -> bytes:
+        """
+        Coroutine version of get_screenshot_bytes().
+        
+        The capture runs as an asyncio subprocess, so waits can overlap it
+        without tying up a worker thread.
+        
+        Returns:
+            PNG image bytes (JPEG when streaming from minicap)
+        """
+        frame = self._minicap.latest_frame() if self._minicap is not None else None
+        if frame is not None:
+            return frame
+        args = ["exec-out", "screencap"] if SCREENSHOT_RAW else ["exec-out", "screencap", "-p"]
+        image_bytes = await self._run_command_async(args, timeout=10)
+        if not image_bytes:
+            raise Exception("Failed to capture screenshot")
+        return image_bytes
+    
     def get_screenshot_base64(self) -> str:
         """
         Take a screenshot and return as base64 encoded string.
         
+        The image is encoded straight from the receive buffer, without an
+        intermediate bytes copy.
+        
         Returns:
             Base64 encoded screenshot
         """
-        _, image_bytes = self.take_screenshot()
-        return base64.b64encode(image_bytes).decode('utf-8')
+        return self._finish_capture(self.start_screenshot(raw=False), _b64_ascii)
     
     # ==================== Touch/Tap Tools ====================
     
@@ -154,8 +592,8 @@ class ADBTools:
             Result message
         """
         logger.info(f"Tapping at ({x}, {y})")
-        self._run_shell_command(["input", "tap", str(x), str(y)])
-        time.sleep(ACTION_DELAY)
+        self._run_in_shell(["input", "tap", str(x), str(y)])
+        self._settle()
         return f"Tapped at coordinates ({x}, {y})"
     
     def double_tap(self, x: int, y: int) -> str:
@@ -170,9 +608,11 @@ class ADBTools:
             Result message
         """
         logger.info(f"Double tapping at ({x}, {y})")
-        self.tap(x, y)
-        time.sleep(0.1)
-        self.tap(x, y)
+        # Both taps in one shell command, back to back, with a single settle
+        # afterwards; separate tap() calls left a full settle between them
+        tap = ["input", "tap", str(x), str(y)]
+        self._run_in_shell([*tap, ";", *tap])
+        self._settle()
         return f"Double tapped at coordinates ({x}, {y})"
     
     def long_press(self, x: int, y: int, duration_ms: int = 1000) -> str:
@@ -188,11 +628,11 @@ class ADBTools:
             Result message
         """
         logger.info(f"Long pressing at ({x}, {y}) for {duration_ms}ms")
-        self._run_shell_command([
+        self._run_in_shell([
             "input", "swipe", 
             str(x), str(y), str(x), str(y), str(duration_ms)
         ])
-        time.sleep(ACTION_DELAY)
+        self._settle()
         return f"Long pressed at ({x}, {y}) for {duration_ms}ms"
     
     # ==================== Swipe/Scroll Tools ====================
@@ -213,27 +653,29 @@ class ADBTools:
             Result message
         """
         logger.info(f"Swiping from ({start_x}, {start_y}) to ({end_x}, {end_y})")
-        self._run_shell_command([
+        self._run_in_shell([
             "input", "swipe",
             str(start_x), str(start_y),
             str(end_x), str(end_y),
             str(duration_ms)
         ])
-        time.sleep(ACTION_DELAY)
+        self._settle()
         return f"Swiped from ({start_x}, {start_y}) to ({end_x}, {end_y})"
     
     def scroll_up(self) -> str:
         """Scroll up on the screen."""
-        center_x = SCREEN_WIDTH // 2
-        start_y = SCREEN_HEIGHT * 2 // 3
-        end_y = SCREEN_HEIGHT // 3
+        width, height = self.get_screen_size()
+        center_x = width // 2
+        start_y = height * 2 // 3
+        end_y = height // 3
         return self.swipe(center_x, start_y, center_x, end_y, 500)
     
     def scroll_down(self) -> str:
         """Scroll down on the screen."""
-        center_x = SCREEN_WIDTH // 2
-        start_y = SCREEN_HEIGHT // 3
-        end_y = SCREEN_HEIGHT * 2 // 3
+        width, height = self.get_screen_size()
+        center_x = width // 2
+        start_y = height // 3
+        end_y = height * 2 // 3
         return self.swipe(center_x, start_y, center_x, end_y, 500)
     
     # ==================== Text Input Tools ====================
@@ -242,37 +684,81 @@ class ADBTools:
         """
         Type text into the focused field.
         
+        Long or non-ASCII text is committed in one go, through ADBKeyboard
+        when it is the active keyboard or else pasted from the clipboard,
+        since `input text` injects one event per character and cannot type
+        most non-ASCII characters.
+        
         Args:
             text: Text to type (spaces will be handled)
             
         Returns:
             Result message
         """
-        # Replace spaces with %s for ADB
-        escaped_text = text.replace(" ", "%s")
-        # Escape special characters
-        escaped_text = escaped_text.replace("'", "\\'")
-        escaped_text = escaped_text.replace('"', '\\"')
-        escaped_text = escaped_text.replace("&", "\\&")
-        escaped_text = escaped_text.replace("<", "\\<")
-        escaped_text = escaped_text.replace(">", "\\>")
-        escaped_text = escaped_text.replace(";", "\\;")
-        escaped_text = escaped_text.replace("(", "\\(")
-        escaped_text = escaped_text.replace(")", "\\)")
-        escaped_text = escaped_text.replace("|", "\\|")
-        
         logger.info(f"Typing text: {text}")
-        self._run_shell_command(["input", "text", escaped_text])
-        time.sleep(ACTION_DELAY)
+        bulk = len(text) > TEXT_PASTE_THRESHOLD or not text.isascii()
+        if not (bulk and (self._type_with_adb_keyboard(text) or self._paste_text(text))):
+            self._run_in_shell(["input", "text", escape_input_text(text)])
+        self._settle()
         return f"Typed text: {text}"
     
+    def _type_with_adb_keyboard(self, text: str) -> bool:
+        """
+        Type text with a single broadcast to the ADBKeyboard input method.
+        
+        Args:
+            text: Text to type
+        
+        Returns:
+            True if the text was sent, False if ADBKeyboard is not the
+            active keyboard or did not receive the broadcast
+        """
+        if self._adbkeyboard_available is None:
+            ime = self._run_in_shell(["settings", "get", "secure", "default_input_method"], mutates=False)
+            self._adbkeyboard_available = ime.strip() == _ADB_KEYBOARD_IME
+        if not self._adbkeyboard_available:
+            return False
+        # Base64, so the message needs no shell quoting and keeps any Unicode
+        output = self._run_in_shell([
+            "am", "broadcast", "-a", "ADB_INPUT_B64", "--es", "msg", _b64_ascii(text.encode("utf-8"))
+        ])
+        if "Broadcast completed" in output:
+            return True
+        logger.warning(f"ADBKeyboard broadcast failed, falling back: {output.strip()}")
+        self._adbkeyboard_available = False
+        return False
+    
+    def _paste_text(self, text: str) -> bool:
+        """
+        Put text on the device clipboard and paste it into the focused field.
+        
+        Args:
+            text: Text to paste
+        
+        Returns:
+            True if the text was pasted, False if the device cannot set the
+            clipboard from the shell (later calls then skip straight to False)
+        """
+        if not self._can_paste:
+            return False
+        # Base64 keeps quoting out of the way; the marker is only echoed if
+        # both the clipboard write and the paste key event succeeded
+        script = (
+            f"echo {_b64_ascii(text.encode('utf-8'))} | base64 -d"
+            " | cmd clipboard set-text-from-stdin && input keyevent 279 && echo __PASTED__"
+        )
+        if "__PASTED__" in self._run_in_shell([script]):
+            return True
+        logger.info("Device cannot set the clipboard from the shell, typing text instead")
+        self._can_paste = False
+        return False
+    
     def clear_text_field(self) -> str:
         """Clear the currently focused text field."""
         logger.info("Clearing text field")
-        # Select all (Ctrl+A) and delete
-        self._run_shell_command(["input", "keyevent", "123"])  # Move to end
-        for _ in range(100):  # Delete up to 100 characters
-            self._run_shell_command(["input", "keyevent", "67"])  # Backspace
+        # Move to end, then delete up to 100 characters; `input keyevent`
+        # takes several key codes, so this is one command instead of 101
+        self._run_in_shell(["input", "keyevent", "123"] + ["67"] * 100)
         return "Cleared text field"
     
     # ==================== Key Event Tools ====================
@@ -298,8 +784,8 @@ class ADBTools:
             Result message
         """
         logger.info(f"Pressing key: {keycode}")
-        self._run_shell_command(["input", "keyevent", str(keycode)])
-        time.sleep(ACTION_DELAY)
+        self._run_in_shell(["input", "keyevent", str(keycode)])
+        self._settle()
         return f"Pressed key: {keycode}"
     
     def press_back(self) -> str:
@@ -318,6 +804,30 @@ class ADBTools:
         """Press the menu button."""
         return self.press_key(82)
     
+    # ==================== Batch Tools ====================
+    
+    def run_batch(self, commands: List[List[str]], parallel: bool = False) -> str:
+        """
+        Run several shell commands in a single adb shell invocation.
+        
+        Args:
+            commands: Shell commands as argument lists, e.g.
+                [["input", "tap", "100", "200"], ["input", "keyevent", "66"]]
+            parallel: If True, run the commands concurrently on the device
+                and wait for all of them; only for independent commands
+        
+        Returns:
+            Result message
+        """
+        if parallel:
+            script = " & ".join(" ".join(cmd) for cmd in commands) + " & wait"
+        else:
+            script = " ; ".join(" ".join(cmd) for cmd in commands)
+        logger.info(f"Running batch of {len(commands)} commands: {script}")
+        self._run_in_shell([script])
+        self._settle()
+        return f"Ran batch of {len(commands)} commands"
+    
     # ==================== App Management Tools ====================
     
     def launch_app(self, package_name: str, activity: str = None) -> str:
@@ -332,14 +842,15 @@ class ADBTools:
             Result message
         """
         logger.info(f"Launching app: {package_name}")
+        self._ui_cache = None
         
         if activity:
             component = f"{package_name}/{activity}"
-            self._run_shell_command([
+            self._run_in_shell([
                 "am", "start", "-n", component
             ])
         else:
-            self._run_shell_command([
+            self._run_in_shell([
                 "monkey", "-p", package_name, 
                 "-c", "android.intent.category.LAUNCHER", "1"
             ])
@@ -358,17 +869,22 @@ class ADBTools:
             Result message
         """
         logger.info(f"Closing app: {package_name}")
-        self._run_shell_command(["am", "force-stop", package_name])
-        time.sleep(ACTION_DELAY)
+        self._ui_cache = None
+        self._run_in_shell(["am", "force-stop", package_name])
+        self._settle()
         return f"Closed app: {package_name}"
     
     def get_current_activity(self) -> str:
-        """Get the currently focused activity."""
-        result = self._run_shell_command([
-            "dumpsys", "activity", "activities", 
-            "|", "grep", "mCurrentFocus"
-        ])
-        return result.strip()
+        """
+        Get the currently focused window.
+        
+        Returns:
+            e.g. "mCurrentFocus=Window{1a2b u0 md.obsidian/md.obsidian.MainActivity}",
+            or "" if no window has focus
+        """
+        result = self._run_in_shell(_CURRENT_FOCUS_CMD, mutates=False, text=False)
+        match = _CURRENT_FOCUS_RE.search(result)
+        return match.group(0).strip().decode("utf-8", errors="replace") if match else ""
     
     # ==================== Device Info Tools ====================
     
@@ -376,25 +892,44 @@ class ADBTools:
         """
         Get the device screen size.
         
+        The size is read from the device once and reused afterwards.
+        
         Returns:
             Tuple of (width, height)
         """
-        result = self._run_shell_command(["wm", "size"])
-        # Parse "Physical size: 1344x2992"
-        if "Physical size:" in result:
-            size_str = result.split("Physical size:")[1].strip()
-            width, height = map(int, size_str.split("x"))
-            return width, height
+        if self._screen_size is not None:
+            return self._screen_size
+        result = self._run_in_shell(["wm", "size"], mutates=False, text=False)
+        # Parse "Physical size: 1344x2992" (an "Override size" line may follow)
+        match = _PHYSICAL_SIZE_RE.search(result)
+        if match:
+            self._screen_size = (int(match.group(1)), int(match.group(2)))
+            return self._screen_size
         return SCREEN_WIDTH, SCREEN_HEIGHT
     
     def get_device_info(self) -> dict:
-        """Get device information."""
-        info = {
-            "model": self._run_shell_command(["getprop", "ro.product.model"]).strip(),
-            "android_version": self._run_shell_command(["getprop", "ro.build.version.release"]).strip(),
-            "sdk_version": self._run_shell_command(["getprop", "ro.build.version.sdk"]).strip(),
-        }
-        return info
+        """
+        Get device information.
+        
+        Once every property has been read it is served from memory; a partial
+        read (e.g. while the device is still booting) is retried next call.
+        """
+        if self._device_info is not None:
+            return dict(self._device_info)
+        info = _parse_device_info(self._run_in_shell([_DEVICE_INFO_SCRIPT], mutates=False))
+        if all(info.values()):
+            self._device_info = info
+        return dict(info)
+    
+    async def get_device_info_async(self) -> dict:
+        """Coroutine version of get_device_info() that does not block the event loop."""
+        if self._device_info is not None:
+            return dict(self._device_info)
+        output = await self._run_command_async(["shell", _DEVICE_INFO_SCRIPT])
+        info = _parse_device_info(output.decode("utf-8", errors="replace"))
+        if all(info.values()):
+            self._device_info = info
+        return dict(info)
     
     # ==================== Utility Tools ====================
     
@@ -412,6 +947,94 @@ class ADBTools:
         time.sleep(seconds)
         return f"Waited for {seconds} seconds"
     
+    def _settle(self, timeout: float = ACTION_DELAY) -> bool:
+        """
+        Wait after an action until the window manager has no layout pass
+        pending, instead of always sleeping the full ACTION_DELAY.
+        
+        Polls back off exponentially from 1 ms. Each poll is a round-trip to
+        the device, so a fast device settles after one or two of them.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the layout settled, False if the timeout was reached
+        """
+        if not self._settle_polling:
+            time.sleep(timeout)
+            return False
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            output = self._run_in_shell(
+                ["dumpsys", "window", "windows", "|", "grep", "-m", "1", "mTraversalScheduled"],
+                mutates=False, text=False
+            )
+            match = _TRAVERSAL_SCHEDULED_RE.search(output)
+            if match is None:
+                logger.info("Device does not report mTraversalScheduled, settling with a fixed delay")
+                self._settle_polling = False
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                return False
+            if match.group(1) == b"false":
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay *= 2
+    
+    def wait_for_idle(self, timeout: float = SCREENSHOT_DELAY) -> bool:
+        """
+        Wait until the UI stops changing, instead of sleeping a fixed time.
+        
+        The UI hierarchy is dumped repeatedly and the UI is considered idle
+        once two consecutive dumps are identical. Each dump already waits for
+        the app to idle, so dumps follow each other without a pause. A dump is
+        only started if the last one would still fit in the time left, and it
+        is cut off at the deadline, which only kills that dump's own adb
+        process. The final dump is cached for the element lookups that follow.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the UI went idle, False if the timeout was reached
+        """
+        deadline = time.monotonic() + timeout
+        previous = None
+        dump_time = 0.0
+        while True:
+            started = time.monotonic()
+            remaining = deadline - started
+            if remaining <= dump_time:
+                break
+            try:
+                xml_str = self._poll_ui_xml(timeout=remaining)
+            except subprocess.TimeoutExpired:
+                break
+            dump_time = time.monotonic() - started
+            if xml_str and xml_str == previous:
+                # Not tied to a screenshot yet; refresh_ui_tree() adopts it
+                self._ui_cache = (None, xml_str, time.monotonic())
+                return True
+            previous = xml_str
+        logger.debug("UI did not go idle within %ss", timeout)
+        return False
+    
+    def get_ui_state_hash(self) -> Optional[bytes]:
+        """
+        Hash the current UI hierarchy so screen states can be compared cheaply.
+        
+        Returns:
+            Short digest of the UI dump, or None if the dump failed
+        """
+        xml_str = self._get_ui_xml()
+        if not xml_str:
+            return None
+        return hashlib.blake2b(xml_str.encode(), digest_size=8).digest()
+    
     def get_ui_hierarchy(self) -> str:
         """
         Dump the UI hierarchy (for debugging).
@@ -419,9 +1042,7 @@ class ADBTools:
         Returns:
             UI hierarchy XML
         """
-        self._run_shell_command(["uiautomator", "dump", "/sdcard/ui_dump.xml"])
-        result = self._run_shell_command(["cat", "/sdcard/ui_dump.xml"])
-        return result
+        return self._get_ui_xml()
     
     # ==================== UI Automator Tools ====================
     
@@ -429,13 +1050,124 @@ class ADBTools:
         """
         Dump UI hierarchy and return as XML string.
         
+        The dump is streamed straight to the shell's stdout, which saves the
+        second `cat` round-trip and the write to /sdcard. Devices that cannot
+        do that fall back to dumping to a file.
+        
         Returns:
-            UI hierarchy XML string
+            UI hierarchy XML string, or "" if the dump failed (e.g. the UI
+            never became idle) so a stale dump file is not mistaken for it
         """
-        self._run_shell_command(["uiautomator", "dump", "/sdcard/ui_dump.xml"])
-        result = self._run_shell_command(["cat", "/sdcard/ui_dump.xml"])
+        if self._ui_dump_streams:
+            xml_str = self._extract_streamed_dump(
+                self._run_in_shell(["uiautomator", "dump", "/dev/stdout", "2>&1"], mutates=False)
+            )
+            if xml_str is not None:
+                return xml_str
+        
+        # The persistent shell drops stderr, so fold it in to see dump errors
+        dump_output = self._run_in_shell(["uiautomator", "dump", "/sdcard/ui_dump.xml", "2>&1"], mutates=False)
+        if "ERROR" in dump_output:
+            logger.warning(f"UI dump failed: {dump_output.strip()}")
+            return ""
+        result = self._run_in_shell(["cat", "/sdcard/ui_dump.xml"], mutates=False)
         return result
     
+    def _poll_ui_xml(self, timeout: float) -> str:
+        """
+        Dump the UI hierarchy in a one-off `adb shell`, for wait_for_idle().
+        
+        Timing out through the persistent shell would close the session
+        (it is stuck behind the dump); here only this adb process is killed.
+        
+        Args:
+            timeout: Seconds to wait for the dump
+        
+        Returns:
+            UI hierarchy XML string, or "" if the dump failed
+        
+        Raises:
+            subprocess.TimeoutExpired: If the dump did not finish in time
+        """
+        self._ensure_connected()
+        streams = self._ui_dump_streams
+        if streams:
+            script = "uiautomator dump /dev/stdout 2>&1"
+        else:
+            # Remove the old file first so a failed dump is not mistaken for a stale one
+            script = ("rm -f /sdcard/ui_dump.xml; uiautomator dump /sdcard/ui_dump.xml >/dev/null 2>&1; "
+                      "cat /sdcard/ui_dump.xml 2>/dev/null")
+        result = subprocess.run([*self.adb_prefix, "shell", script], capture_output=True, timeout=timeout)
+        output = result.stdout.decode("utf-8", errors="replace")
+        if streams:
+            # None means streaming was just switched off; the next poll dumps to a file
+            return self._extract_streamed_dump(output, quiet=True) or ""
+        return output if "</hierarchy>" in output else ""
+    
+    def _extract_streamed_dump(self, output: str, quiet: bool = False) -> Optional[str]:
+        """
+        Cut the XML out of `uiautomator dump /dev/stdout` output.
+        
+        Args:
+            output: Command output, with stderr folded in
+            quiet: Log a failed dump at debug level instead of as a warning
+        
+        Returns:
+            The XML, "" if the dump failed, or None if the device cannot
+            stream dumps (streaming is then switched off for this instance)
+        """
+        # The XML has no trailing newline, so the "UI hierchary dumped
+        # to: ..." banner ends up on the same line as its closing tag
+        end = output.rfind("</hierarchy>")
+        if end != -1:
+            return output[output.find("<?xml"):end + len("</hierarchy>")]
+        if "idle state" in output:
+            (logger.debug if quiet else logger.warning)(f"UI dump failed: {output.strip()}")
+            return ""
+        logger.info("Device cannot stream UI dumps, dumping to /sdcard instead")
+        self._ui_dump_streams = False
+        return None
+    
+    def refresh_ui_tree(self, frame_key: Optional[bytes] = None) -> str:
+        """
+        Dump the UI hierarchy once for the current frame and cache it.
+        
+        The element lookups read the cached dump, so several lookups on the
+        same screen cost a single `uiautomator dump`. Any command that can
+        change the screen drops the cache.
+        
+        Args:
+            frame_key: Identifies the screen the dump belongs to (e.g. a hash
+                of its screenshot). A matching key reuses the cached dump, as
+                does a recent dump not yet tied to a screenshot (such as the
+                one wait_for_idle() ends with); None always dumps again.
+        
+        Returns:
+            UI hierarchy XML string
+        """
+        cache = self._ui_cache
+        now = time.monotonic()
+        if frame_key is not None and cache is not None and (
+                cache[0] == frame_key or (cache[0] is None and now - cache[2] < UI_CACHE_TTL)):
+            # The screenshot shows the dump is still current, or nothing has
+            # touched the screen since it was taken
+            self._ui_cache = (frame_key, cache[1], now)
+            return cache[1]
+        xml_str = self._get_ui_xml()
+        self._ui_cache = (frame_key, xml_str, time.monotonic()) if xml_str else None
+        return xml_str
+    
+    def _get_cached_ui_xml(self) -> str:
+        """
+        Return the cached UI dump, dumping it again if there is none or it
+        is older than UI_CACHE_TTL (the app may have changed the screen on
+        its own since).
+        """
+        cache = self._ui_cache
+        if cache is not None and time.monotonic() - cache[2] < UI_CACHE_TTL:
+            return cache[1]
+        return self.refresh_ui_tree()
+    
     def _parse_bounds(self, bounds_str: str) -> Tuple[int, int, int, int]:
         """
         Parse bounds string like "[0,0][1344,2992]" into (x1, y1, x2, y2).
@@ -446,10 +1178,9 @@ class ADBTools:
         Returns:
             Tuple of (x1, y1, x2, y2)
         """
-        match = re.findall(r'\[(\d+),(\d+)\]', bounds_str)
-        if len(match) == 2:
-            x1, y1 = int(match[0][0]), int(match[0][1])
-            x2, y2 = int(match[1][0]), int(match[1][1])
+        match = _BOUNDS_RE.match(bounds_str)
+        if match:
+            x1, y1, x2, y2 = map(int, match.groups())
             return x1, y1, x2, y2
         raise ValueError(f"Could not parse bounds: {bounds_str}")
     
@@ -464,7 +1195,38 @@ class ADBTools:
             Tuple of (center_x, center_y)
         """
         x1, y1, x2, y2 = bounds
-        return (x1 + x2) // 2, (y1 + y2) // 2
+        # Coordinates are never negative, so a shift is the same as // 2
+        return (x1 + x2) >> 1, (y1 + y2) >> 1
+    
+    def _iter_nodes(self, attribute: str):
+        """
+        Iterate over the UI nodes of the cached dump that have an attribute.
+        
+        The dump is parsed once and the nodes are reused by every lookup on
+        the same dump. Unlike matching the raw XML, this does not depend on
+        attribute order and unescapes entities such as &amp;.
+        
+        Args:
+            attribute: Attribute to read, e.g. "text" or "resource-id"
+        
+        Yields:
+            Tuples of (attribute value, bounds string)
+        """
+        xml_str = self._get_cached_ui_xml()
+        cached = self._ui_nodes
+        if cached is None or cached[0] is not xml_str:
+            try:
+                nodes = list(etree.fromstring(xml_str.encode("utf-8")).iter("node"))
+            except SyntaxError as e:  # lxml and ElementTree parse errors both derive from it
+                if xml_str:
+                    logger.warning(f"Could not parse UI dump: {e}")
+                nodes = []
+            cached = self._ui_nodes = (xml_str, nodes)
+        for node in cached[1]:
+            value = node.get(attribute)
+            bounds_str = node.get("bounds")
+            if value is not None and bounds_str is not None:
+                yield value, bounds_str
     
     def find_element_by_text(self, text: str) -> Optional[Dict]:
         """
@@ -477,21 +1239,7 @@ class ADBTools:
             Dict with element info (bounds, center_x, center_y) or None if not found
         """
         logger.info(f"Finding element by text: '{text}'")
-        xml_str = self._get_ui_xml()
-        
-        # Search for node elements with matching text and bounds attributes
-        # The attributes may not be adjacent, so we need to match the whole node
-        node_pattern = r'<node[^>]+text="([^"]*)"[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]*/?>|<node[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]+text="([^"]*)"[^>]*/?>'
-        
-        for match in re.finditer(node_pattern, xml_str):
-            # Handle both orderings of text and bounds attributes
-            if match.group(1) is not None:
-                found_text = match.group(1)
-                bounds_str = match.group(2)
-            else:
-                found_text = match.group(4)
-                bounds_str = match.group(3)
-            
+        for found_text, bounds_str in self._iter_nodes("text"):
             if found_text == text:
                 try:
                     bounds = self._parse_bounds(bounds_str)
@@ -521,20 +1269,7 @@ class ADBTools:
             Dict with element info (bounds, center_x, center_y) or None if not found
         """
         logger.info(f"Finding element containing text: '{text}'")
-        xml_str = self._get_ui_xml()
-        
-        # Search for node elements with text containing search string
-        node_pattern = r'<node[^>]+text="([^"]*)"[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]*/?>|<node[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]+text="([^"]*)"[^>]*/?>'
-        
-        for match in re.finditer(node_pattern, xml_str):
-            # Handle both orderings of text and bounds attributes
-            if match.group(1) is not None:
-                found_text = match.group(1)
-                bounds_str = match.group(2)
-            else:
-                found_text = match.group(4)
-                bounds_str = match.group(3)
-            
+        for found_text, bounds_str in self._iter_nodes("text"):
             if found_text and text.lower() in found_text.lower():
                 try:
                     bounds = self._parse_bounds(bounds_str)
@@ -564,19 +1299,7 @@ class ADBTools:
             Dict with element info or None if not found
         """
         logger.info(f"Finding element by resource-id: '{resource_id}'")
-        xml_str = self._get_ui_xml()
-        
-        # Search for node elements with matching resource-id
-        node_pattern = r'<node[^>]+resource-id="([^"]*)"[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]*/?>|<node[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]+resource-id="([^"]*)"[^>]*/?>'
-        
-        for match in re.finditer(node_pattern, xml_str):
-            if match.group(1) is not None:
-                found_id = match.group(1)
-                bounds_str = match.group(2)
-            else:
-                found_id = match.group(4)
-                bounds_str = match.group(3)
-            
+        for found_id, bounds_str in self._iter_nodes("resource-id"):
             if found_id and resource_id in found_id:
                 try:
                     bounds = self._parse_bounds(bounds_str)
@@ -648,19 +1371,7 @@ class ADBTools:
             Dict with element info or None if not found
         """
         logger.info(f"Finding element by hint: '{hint}'")
-        xml_str = self._get_ui_xml()
-        
-        # Search for node elements with matching hint
-        node_pattern = r'<node[^>]+hint="([^"]*)"[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]*/?>|<node[^>]+bounds="(\[[^\]]+\]\[[^\]]+\])"[^>]+hint="([^"]*)"[^>]*/?>'
-        
-        for match in re.finditer(node_pattern, xml_str):
-            if match.group(1) is not None:
-                found_hint = match.group(1)
-                bounds_str = match.group(2)
-            else:
-                found_hint = match.group(4)
-                bounds_str = match.group(3)
-            
+        for found_hint, bounds_str in self._iter_nodes("hint"):
             if found_hint and hint.lower() in found_hint.lower():
                 try:
                     bounds = self._parse_bounds(bounds_str)
@@ -718,18 +1429,27 @@ class ADBTools:
             return error_msg
 
 
+@functools.lru_cache(maxsize=8)
+def _shared_adb_tools(device_serial: str) -> ADBTools:
+    """Get the ADBTools instance shared by every tool set for a device."""
+    return ADBTools(device_serial)
+
+
 # Create tool functions for ADK integration
 def create_adb_tools(device_serial: str = None) -> dict:
     """
     Create a dictionary of ADB tool functions for agent use.
     
+    Repeated calls for the same device reuse one ADBTools instance, so its
+    connection check and persistent shell are set up only once.
+    
     Args:
         device_serial: Optional device serial
         
     Returns:
         Dictionary of tool functions
     """
-    adb = ADBTools(device_serial)
+    adb = _shared_adb_tools(device_serial or EMULATOR_SERIAL)
     
     return {
         "take_screenshot": adb.take_screenshot,
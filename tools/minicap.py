@@ -0,0 +1,175 @@
+"""
+Minicap Screen Streaming
+
+This module streams frames from minicap (https://github.com/openstf/minicap)
+running on the device. minicap pushes JPEG frames over a local socket as
+the screen changes, so the latest frame is always available without
+spawning `screencap` and waiting for it to encode a PNG.
+"""
+
+import socket
+import struct
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+from config.settings import MINICAP_DIR, MINICAP_PORT, SCREEN_WIDTH, SCREEN_HEIGHT
+from utils.logger import setup_logger
+
+logger = setup_logger("Minicap")
+
+DEVICE_DIR = "/data/local/tmp"
+BANNER_SIZE = 24
+
+
+class MinicapStream:
+    """
+    Keeps the most recent minicap frame for a device.
+    """
+    
+    def __init__(self, adb_prefix: Sequence[str], screen_size: Tuple[int, int] = (SCREEN_WIDTH, SCREEN_HEIGHT)):
+        """
+        Initialize the stream.
+        
+        Args:
+            adb_prefix: adb command prefix targeting the device
+            screen_size: Device (width, height); frames are streamed at this size
+        """
+        self.adb_prefix = list(adb_prefix)
+        self.screen_size = screen_size
+        self._proc: Optional[subprocess.Popen] = None
+        self._sock: Optional[socket.socket] = None
+        self._frame: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._running = False
+        self.port: Optional[int] = None  # Local port forwarded to this device's minicap socket
+    
+    def _adb(self, *args: str) -> str:
+        """Run an adb command and return stdout, raising on failure."""
+        result = subprocess.run(
+            self.adb_prefix + list(args),
+            capture_output=True, text=True, timeout=30, check=True
+        )
+        return result.stdout.strip()
+    
+    def _push_binaries(self):
+        """Push the minicap binary and shared library matching the device."""
+        abi = self._adb("shell", "getprop", "ro.product.cpu.abi")
+        sdk = self._adb("shell", "getprop", "ro.build.version.sdk")
+        
+        # Layout of the minicap-prebuilt package
+        binary = Path(MINICAP_DIR) / abi / "bin" / "minicap"
+        library = Path(MINICAP_DIR) / abi / "lib" / f"android-{sdk}" / "minicap.so"
+        if not binary.exists() or not library.exists():
+            raise FileNotFoundError(f"No minicap build for {abi} / android-{sdk} in {MINICAP_DIR}")
+        
+        self._adb("push", str(binary), f"{DEVICE_DIR}/minicap")
+        self._adb("push", str(library), f"{DEVICE_DIR}/minicap.so")
+        self._adb("shell", "chmod", "755", f"{DEVICE_DIR}/minicap")
+    
+    def _connect(self, timeout: float = 5.0) -> socket.socket:
+        """Connect to the forwarded minicap socket and consume its banner."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                sock = socket.create_connection(("127.0.0.1", self.port), timeout=2)
+                self._read_exact(sock, BANNER_SIZE)
+                sock.settimeout(None)
+                return sock
+            except (OSError, ConnectionError):
+                # minicap needs a moment to start listening
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+    
+    @staticmethod
+    def _read_exact(sock: socket.socket, size: int) -> bytes:
+        """Read exactly size bytes from the socket."""
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise ConnectionError("minicap socket closed")
+            buf += chunk
+        return bytes(buf)
+    
+    def start(self) -> bool:
+        """
+        Push minicap, start it on the device and begin reading frames.
+        
+        Returns:
+            True if frames are streaming, False if minicap is unavailable
+        """
+        try:
+            self._push_binaries()
+            width, height = self.screen_size
+            projection = f"{width}x{height}@{width}x{height}/0"
+            self._proc = subprocess.Popen(
+                self.adb_prefix + [
+                    "shell", f"LD_LIBRARY_PATH={DEVICE_DIR}",
+                    f"{DEVICE_DIR}/minicap", "-P", projection
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            # tcp:0 lets adb pick a free port (and print it), so streams for
+            # several devices do not fight over one
+            forwarded = self._adb("forward", f"tcp:{MINICAP_PORT}", "localabstract:minicap")
+            self.port = int(forwarded) if MINICAP_PORT == 0 else MINICAP_PORT
+            self._sock = self._connect()
+        except Exception as e:
+            logger.warning(f"minicap unavailable, falling back to screencap: {e}")
+            self.close()
+            return False
+        
+        self._running = True
+        threading.Thread(target=self._read_frames, name="minicap", daemon=True).start()
+        logger.info(f"minicap streaming on port {self.port}")
+        return True
+    
+    def _read_frames(self):
+        """Keep replacing the stored frame with the newest one from the socket."""
+        try:
+            while self._running:
+                (size,) = struct.unpack("<I", self._read_exact(self._sock, 4))
+                frame = self._read_exact(self._sock, size)
+                with self._lock:
+                    self._frame = frame
+        except (OSError, ConnectionError) as e:
+            if self._running:
+                logger.warning(f"minicap stream stopped: {e}")
+        finally:
+            self._running = False
+    
+    def latest_frame(self) -> Optional[bytes]:
+        """
+        Get the most recent frame.
+        
+        Returns:
+            JPEG bytes, or None if the stream is not running
+        """
+        if not self._running:
+            return None
+        with self._lock:
+            return self._frame
+    
+    def close(self):
+        """Stop reading and shut down minicap on the device."""
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+        if self.port is not None:
+            subprocess.run(
+                self.adb_prefix + ["forward", "--remove", f"tcp:{self.port}"],
+                capture_output=True
+            )
+            self.port = None
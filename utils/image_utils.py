@@ -0,0 +1,146 @@
+"""
+Image utilities for Mobile QA Multi-Agent System
+"""
+
+import struct
+from io import BytesIO
+from typing import Optional, Tuple
+from PIL import Image
+from config.settings import (
+    PLANNER_IMAGE_FORMAT,
+    PLANNER_IMAGE_QUALITY,
+    PLANNER_IMAGE_LOSSLESS,
+    PLANNER_IMAGE_MAX_SIZE
+)
+
+# screencap pixel formats (android PixelFormat) and the PIL raw modes that decode them to RGB
+_RAW_MODES = {1: "RGBX", 2: "RGBX", 5: "BGRX"}
+
+
+def raw_frame_info(image_bytes) -> Optional[Tuple[int, int, int, str]]:
+    """
+    Read the header of an unencoded `screencap` frame.
+    
+    The header holds width, height and pixel format as little-endian
+    uint32s; newer Android versions append a color space, so the pixel
+    data offset is worked out from the total size.
+    
+    Args:
+        image_bytes: Captured screenshot bytes
+    
+    Returns:
+        Tuple of (width, height, pixel data offset, PIL raw mode), or None
+        if the bytes are an encoded (PNG/JPEG) image
+    """
+    if len(image_bytes) < 12 or image_bytes[:4] == b"\x89PNG" or image_bytes[:3] == b"\xff\xd8\xff":
+        return None
+    width, height, pixel_format = struct.unpack_from("<III", image_bytes)
+    offset = len(image_bytes) - width * height * 4
+    if pixel_format not in _RAW_MODES or offset not in (12, 16):
+        return None
+    return width, height, offset, _RAW_MODES[pixel_format]
+
+
+def open_screenshot(image_bytes) -> Image.Image:
+    """
+    Open a captured screenshot, encoded or raw.
+    
+    Args:
+        image_bytes: PNG/JPEG bytes, or an unencoded screencap frame
+    
+    Returns:
+        PIL image (raw frames are decoded to RGB; the alpha byte is padding)
+    """
+    info = raw_frame_info(image_bytes)
+    if info is None:
+        return Image.open(BytesIO(image_bytes))
+    width, height, offset, rawmode = info
+    return Image.frombytes("RGB", (width, height), memoryview(image_bytes)[offset:], "raw", rawmode)
+
+
+def to_png(image_bytes) -> bytes:
+    """
+    Get file-ready bytes for a screenshot.
+    
+    Encoded images are returned unchanged; raw frames are PNG-encoded with
+    light compression, since this runs once per saved file.
+    
+    Args:
+        image_bytes: Captured screenshot bytes
+    
+    Returns:
+        PNG or JPEG bytes
+    """
+    if raw_frame_info(image_bytes) is None:
+        return image_bytes
+    buf = BytesIO()
+    open_screenshot(image_bytes).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def encode_for_planner(png_bytes: bytes) -> Tuple[bytes, str, Tuple[int, int]]:
+    """
+    Re-encode a PNG screenshot into a smaller image for the vision model.
+    
+    The screenshot is shrunk to fit PLANNER_IMAGE_MAX_SIZE and saved as
+    PLANNER_IMAGE_FORMAT, which is far smaller than the device PNG while
+    keeping UI text legible.
+    
+    Args:
+        png_bytes: PNG screenshot bytes (or JPEG / raw screencap frame)
+    
+    Returns:
+        Tuple of (image_bytes, mime_type, (width, height) of the encoded image)
+    """
+    img = open_screenshot(png_bytes)
+    img.draft("RGB", PLANNER_IMAGE_MAX_SIZE)  # JPEG input (minicap) decodes at reduced scale
+    
+    # thumbnail() keeps the aspect ratio and never upscales
+    img.thumbnail(PLANNER_IMAGE_MAX_SIZE, Image.BILINEAR)
+    
+    # screencap PNGs are RGBA, which JPEG cannot store
+    if PLANNER_IMAGE_FORMAT == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    
+    buf = BytesIO()
+    img.save(
+        buf,
+        format=PLANNER_IMAGE_FORMAT,
+        quality=PLANNER_IMAGE_QUALITY,
+        lossless=PLANNER_IMAGE_LOSSLESS
+    )
+    return buf.getvalue(), f"image/{PLANNER_IMAGE_FORMAT.lower()}", img.size
+
+
+def perceptual_hash(png_bytes: bytes) -> int:
+    """
+    Compute a 128-bit perceptual hash of a screenshot.
+    
+    The upper 64 bits are a difference hash of the grayscale layout; the
+    lower 64 bits mark which of 64 coarse colors appear on screen, so two
+    screens with the same layout but different colors (e.g. a purple vs a
+    red accent) hash differently. Screens that look the same (e.g. differing
+    only in compression noise or a blinking cursor pixel) get the same hash.
+    
+    Args:
+        png_bytes: Encoded screenshot bytes
+    
+    Returns:
+        Hash as an integer
+    """
+    img = open_screenshot(png_bytes)
+    img.draft("RGB", (64, 64))  # Let JPEG decoding skip full resolution
+    # reducing_gap box-reduces by an integer factor first, so the filter
+    # only runs on a small image instead of the full 1344x2992 frame
+    small = img.convert("RGB").resize((64, 64), Image.BILINEAR, reducing_gap=2.0)
+    pixels = small.convert("L").resize((9, 8), Image.BILINEAR).tobytes()
+    bits = 0
+    for row in range(0, 72, 9):
+        line = pixels[row:row + 9]
+        for left, right in zip(line, line[1:]):
+            bits = (bits << 1) | (left > right)
+    # Keep the top two bits of each channel: at most 64 distinct colors
+    colors = 0
+    for _, (r, g, b) in small.point(lambda v: v & 0xC0).getcolors(64):
+        colors |= 1 << (r >> 2 | g >> 4 | b >> 6)
+    return bits << 64 | colors
@@ -2,11 +2,53 @@
 Logging utilities for Mobile QA Multi-Agent System
 """
 
+import atexit
+import functools
 import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
 from pathlib import Path
-from config.settings import LOGS_DIR, LOG_LEVEL
+from config.settings import LOGS_DIR, LOG_LEVEL, init_paths
+
+# One log file per run, shared by every logger
+_DEFAULT_LOG_FILE = f"qa_agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+
+_FORMATTER = logging.Formatter(
+    '%(asctime)s | %(name)-12s | %(levelname)-8s | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _console_handler() -> logging.Handler:
+    """Get the stdout handler shared by all loggers."""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.DEBUG)
+    console_handler.setFormatter(_FORMATTER)
+    return console_handler
+
+
+@functools.lru_cache(maxsize=None)
+def _file_handler(log_file: str) -> logging.Handler:
+    """
+    Get the handler that queues records for a log file.
+    
+    A background listener does the writes, so logging calls never wait on
+    disk I/O, and all loggers share one open file.
+    """
+    init_paths()
+    file_handler = logging.FileHandler(LOGS_DIR / log_file)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(_FORMATTER)
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    # Runs before logging's own shutdown hook, so queued records are written
+    atexit.register(listener.stop)
+    return logging.handlers.QueueHandler(log_queue)
 
 
 def setup_logger(name: str, log_file: str = None) -> logging.Logger:
@@ -27,27 +69,8 @@ def setup_logger(name: str, log_file: str = None) -> logging.Logger:
     if logger.handlers:
         return logger
     
-    # Console handler with color formatting
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    
-    # File handler
-    if log_file is None:
-        log_file = f"qa_agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    
-    file_handler = logging.FileHandler(LOGS_DIR / log_file)
-    file_handler.setLevel(logging.DEBUG)
-    
-    # Formatting
-    formatter = logging.Formatter(
-        '%(asctime)s | %(name)-12s | %(levelname)-8s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(_console_handler())
+    logger.addHandler(_file_handler(log_file or _DEFAULT_LOG_FILE))
     
     return logger
 
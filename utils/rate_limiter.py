@@ -0,0 +1,162 @@
+"""
+Rate limiting utilities for Mobile QA Multi-Agent System
+"""
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from collections import deque
+from typing import Tuple
+from config.settings import GEMINI_RPM, GEMINI_TPM, GEMINI_RPD, RATE_LIMIT_SAFETY
+
+# Gemini bills images in 768x768 tiles of 258 tokens; small images are one tile
+IMAGE_TILE_SIZE = 768
+IMAGE_TILE_TOKENS = 258
+
+
+def estimate_tokens(text: str, image_size: Tuple[int, int] = None) -> int:
+    """
+    Roughly estimate the input tokens of a request.
+    
+    Args:
+        text: Prompt text (about 4 characters per token)
+        image_size: Optional (width, height) of an attached image
+    
+    Returns:
+        Estimated token count
+    """
+    tokens = len(text) // 4
+    if image_size is not None:
+        width, height = image_size
+        tiles = math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+        tokens += max(1, tiles) * IMAGE_TILE_TOKENS
+    return tokens
+
+
+class GeminiLimiter:
+    """
+    Sliding-window limiter for requests per minute, tokens per minute and
+    requests per day.
+    
+    Each limit is applied with a safety margin, so bursts go through as
+    long as every window still has room, and a call only waits for as long
+    as the tightest window needs.
+    """
+    
+    def __init__(self, rpm: int, tpm: int, rpd: int = 0, safety: float = 1.0):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rpm: Requests per minute (0 for no limit)
+            tpm: Input tokens per minute (0 for no limit)
+            rpd: Requests per day (0 for no limit)
+            safety: Fraction of each limit that may actually be used
+        """
+        self.rpm = max(1, int(rpm * safety)) if rpm else 0
+        self.tpm = max(1, int(tpm * safety)) if tpm else 0
+        self.rpd = max(1, int(rpd * safety)) if rpd else 0
+        self._minute: deque = deque()  # (timestamp, tokens)
+        self._minute_tokens = 0
+        self._day: deque = deque()  # timestamps
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _prune(self, now: float):
+        """Drop requests that have left their windows."""
+        while self._minute and self._minute[0][0] <= now - 60:
+            self._minute_tokens -= self._minute.popleft()[1]
+        while self._day and self._day[0] <= now - 86400:
+            self._day.popleft()
+    
+    def _time_until_free(self, now: float, tokens: int) -> float:
+        """Seconds until a request of the given size fits in every window."""
+        waits = [self._blocked_until - now]
+        
+        if self.rpm and len(self._minute) >= self.rpm:
+            waits.append(self._minute[len(self._minute) - self.rpm][0] + 60 - now)
+        
+        if self.tpm and self._minute_tokens + tokens > self.tpm:
+            # Wait until enough old requests expire; an oversized request
+            # only has to wait for an empty window
+            excess = self._minute_tokens + min(tokens, self.tpm) - self.tpm
+            for timestamp, used in self._minute:
+                excess -= used
+                if excess <= 0:
+                    waits.append(timestamp + 60 - now)
+                    break
+        
+        if self.rpd and len(self._day) >= self.rpd:
+            waits.append(self._day[len(self._day) - self.rpd] + 86400 - now)
+        
+        return max(waits)
+    
+    def _try_acquire(self, tokens: int) -> float:
+        """Record the request if it fits now, otherwise return the wait needed."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            wait_time = self._time_until_free(now, tokens)
+            if wait_time <= 0:
+                self._minute.append((now, tokens))
+                self._minute_tokens += tokens
+                self._day.append(now)
+            return wait_time
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until a request of the given size is within all limits.
+        
+        Args:
+            tokens: Estimated input tokens of the request
+        
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait_time = self._try_acquire(tokens)
+            if wait_time <= 0:
+                return waited
+            time.sleep(wait_time)
+            waited += wait_time
+    
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Coroutine version of acquire() that waits without blocking the loop.
+        
+        Args:
+            tokens: Estimated input tokens of the request
+        
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait_time = self._try_acquire(tokens)
+            if wait_time <= 0:
+                return waited
+            await asyncio.sleep(wait_time)
+            waited += wait_time
+    
+    def penalize(self, seconds: float):
+        """
+        Hold back all requests for `seconds`, e.g. after a 429.
+        
+        Args:
+            seconds: Back-off requested by the server
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_limiter() -> GeminiLimiter:
+    """
+    Get the process-wide limiter for the Gemini API quota.
+    
+    All planners share it, since the quota is per project, not per client.
+    """
+    return GeminiLimiter(GEMINI_RPM, GEMINI_TPM, GEMINI_RPD, RATE_LIMIT_SAFETY)